@@ -11,11 +11,21 @@ import asyncio
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler
 from telegram import BotCommand, Update
 from contextlib import asynccontextmanager
+from collections import OrderedDict
 import telegram
 from typing import Dict, Any
 from datetime import datetime, timedelta, timezone
 from fastapi.middleware.cors import CORSMiddleware
 
+# uvloop is optioneel: C-backed event loop (libuv) die de dispatch-overhead
+# van de vele korte awaits (Telegram sends, DB calls) verlaagt. Installeren
+# vóór de app gebouwd wordt; uvicorn pakt hem via loop="auto" dan ook op.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+
 # Configureer logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -353,6 +363,12 @@ async def process_tradingview_signal(request: Request):
 
 # Define webhook routes
 
+# Dedupe van Telegram updates: bij webhook retries (trage response, restart)
+# levert Telegram dezelfde update_id opnieuw af; onthoud de recentste ids
+# zodat een dubbele aflevering niet twee keer door de handlers loopt.
+_seen_update_ids: "OrderedDict[int, None]" = OrderedDict()
+_SEEN_UPDATE_MAX = 1024
+
 # Telegram webhook endpoint
 @app.post("/webhook")
 async def telegram_webhook(request: Request):
@@ -361,12 +377,21 @@ async def telegram_webhook(request: Request):
         # Log de binnenkomende request
         body = await request.body()
         logger.info(f"Received Telegram webhook update: {body.decode('utf-8')[:100]}...")
-        
+
         # Parse de JSON data
         data = await request.json()
-        
-        # Stuur de update naar de telegram application
+
+        # Stuur de update naar de telegram application; de update_queue ontkoppelt
+        # de webhook response van het (mogelijk trage) handler-werk
         if telegram_service and telegram_service.application:
+            update_id = data.get("update_id")
+            if update_id is not None:
+                if update_id in _seen_update_ids:
+                    logger.info(f"Duplicate Telegram update {update_id} ignored")
+                    return {"status": "success", "duplicate": True}
+                _seen_update_ids[update_id] = None
+                if len(_seen_update_ids) > _SEEN_UPDATE_MAX:
+                    _seen_update_ids.popitem(last=False)
             update = Update.de_json(data=data, bot=telegram_service.bot)
             await telegram_service.application.update_queue.put(update)
             return {"status": "success"}
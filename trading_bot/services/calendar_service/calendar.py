@@ -130,6 +130,7 @@ CALLBACK_ANALYSIS_CALENDAR = "analysis_calendar"
 # Verwijderen van de vlag-valuta koppeling - we gebruiken geen vlaggen meer maar dikgedrukte tekst
 # In plaats daarvan definiëren we alleen MAJOR_CURRENCIES om consistentie te garanderen
 MAJOR_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "NZD", "CAD"]
+MAJOR_CURRENCIES_SET = frozenset(MAJOR_CURRENCIES)
 
 # Map of instruments to their corresponding currencies
 INSTRUMENT_CURRENCY_MAP = {
@@ -772,7 +773,7 @@ IMPORTANT: ONLY return the JSON with TODAY's events. No explanation text.
         response += "Impact: 🔴 High   🟠 Medium   🟢 Low\n\n"
         
         currencies = INSTRUMENT_CURRENCY_MAP.get(instrument, ["USD"])
-        currencies = [c for c in currencies if c in MAJOR_CURRENCIES]
+        currencies = [c for c in currencies if c in MAJOR_CURRENCIES_SET]
         
         # Check if it's a weekend
         if today.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
@@ -76,6 +76,7 @@ IMPACT_EMOJI = {
 
 # Definieer de major currencies die we altijd willen tonen
 MAJOR_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "NZD", "CAD"]
+MAJOR_CURRENCIES_SET = frozenset(MAJOR_CURRENCIES)
 
 class TradingViewCalendarService:
     """Service for retrieving calendar data directly from TradingView"""
@@ -458,7 +459,7 @@ class TradingViewCalendarService:
                                 
                                 # Only skip non-major currencies if a specific currency is requested
                                 # When no currency is specified, show all events for all major currencies
-                                if currency and currency_code not in MAJOR_CURRENCIES:
+                                if currency and currency_code not in MAJOR_CURRENCIES_SET:
                                     logger.debug(f"Skipping non-major currency: {currency_code}")
                                     non_major_events += 1
                                     continue
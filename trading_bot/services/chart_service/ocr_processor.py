@@ -1,11 +1,15 @@
 import os
+import asyncio
+import hashlib
 import logging
 import re
 import base64
 import json
 import aiohttp
+from collections import OrderedDict, namedtuple
 from typing import Dict, Any, Optional, List
 import random
+import types
 # from google.cloud import vision
 # from google.oauth2 import service_account
 import cv2
@@ -16,6 +20,169 @@ import io
 
 logger = logging.getLogger(__name__)
 
+# Timestamp-like text below a price marker: "32:49" style times or short dates
+_TS_RE = re.compile(r'\d{1,2}:\d{2}|\d{1,2}[/-]\d{1,2}')
+
+
+def _looks_like_time(s: str) -> bool:
+    """Cheap "HH:MM" shape check without entering the regex engine.
+
+    Locates the colon and validates the digit runs on both sides directly;
+    the regex only runs for the rarer date-like forms.
+    """
+    i = s.find(':')
+    return 1 <= i <= 2 and len(s) >= i + 3 and s[:i].isdigit() and s[i + 1:i + 3].isdigit()
+
+# Lightweight row for a parsed text block: bounding box parsed exactly once
+# instead of rebuilding dicts from bounding_poly.vertices at every use site
+_TextBox = namedtuple('_TextBox', ['y1', 'x1', 'x2', 'y2', 'text'])
+
+# One-pass lowercasing plus punctuation stripping for OCR'd labels:
+# a single str.translate call instead of chained .lower()/.replace()
+_LABEL_TRANSLATE = str.maketrans(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'abcdefghijklmnopqrstuvwxyz',
+    '.:,;_()[]'
+)
+
+# Abbreviated label spellings mapped to their canonical market level names
+_ABBREVIATION_MAPPING = {
+    'daily h': 'daily high',
+    'daily l': 'daily low',
+    'weekly h': 'weekly high',
+    'weekly l': 'weekly low',
+    'monthly h': 'monthly high',
+    'monthly l': 'monthly low',
+    'dly h': 'daily high',
+    'dly l': 'daily low',
+    'wkly h': 'weekly high',
+    'wkly l': 'weekly low',
+    'mth h': 'monthly high',
+    'mth l': 'monthly low',
+    'h': 'high',
+    'l': 'low',
+    'hi': 'high',
+    'lo': 'low'
+}
+
+# Single alternation over the period/side vocabularies replaces the chained
+# "term in text" cascade: one match decides both the period and the side
+_PERIOD_SIDE_RE = re.compile(
+    r'(?P<period>daily|day|dly|weekly|week|wkly|monthly|month|mth)\b'
+    r'.*?\b(?P<side>high|hi|h|low|lo|l)\b'
+)
+_PERIOD_CANONICAL = {
+    'daily': 'daily', 'day': 'daily', 'dly': 'daily',
+    'weekly': 'weekly', 'week': 'weekly', 'wkly': 'weekly',
+    'monthly': 'monthly', 'month': 'monthly', 'mth': 'monthly'
+}
+_SIDE_CANONICAL = {
+    'high': 'high', 'hi': 'high', 'h': 'high',
+    'low': 'low', 'lo': 'low', 'l': 'low'
+}
+_SIDE_RE = re.compile(r'\b(high|hi|h|low|lo|l)\b')
+
+# RSI readouts: "RSI: 50.5", "RSI 50.5" or the indicator name followed by a
+# bare integer somewhere on the same text block
+_RSI_RES = (
+    re.compile(r'RSI\D*(\d+\.?\d*)', re.IGNORECASE),
+    re.compile(r'RSI.*?(\d+)', re.IGNORECASE),
+)
+
+# Colors TradingView uses for level labels map directly onto periods
+_COLOR_PERIOD = {'black': 'monthly', 'red': 'weekly', 'yellow': 'daily'}
+
+# Chart sub-regions as fractional (x1, y1, x2, y2) boxes, with the result
+# keys each region contributes. Regions that did not change between frames
+# (price axis, legend, timestamp strip) can be served from cache even when
+# the candle area differs.
+_SEGMENT_REGIONS = {
+    'price_axis': ((0.0, 0.0, 0.12, 1.0), ('daily_high', 'daily_low',
+                                           'weekly_high', 'weekly_low',
+                                           'monthly_high', 'monthly_low')),
+    'legend': ((0.6, 0.0, 1.0, 0.25), ('rsi',)),
+    'timestamp_strip': ((0.0, 0.9, 1.0, 1.0), ('current_price',)),
+}
+
+# Plausible price ranges per symbol, with a fallback price used when OCR
+# produces something outside them. Looked up once per image so the sanity
+# checks are driven by data instead of EURUSD-flavoured magic numbers.
+_SYMBOL_BOUNDS = {
+    'EURUSD': {'min': 0.8, 'max': 1.5, 'fallback': 1.10},
+    'GBPUSD': {'min': 1.0, 'max': 1.7, 'fallback': 1.27},
+    'USDJPY': {'min': 80.0, 'max': 200.0, 'fallback': 150.0},
+    'AUDUSD': {'min': 0.4, 'max': 1.1, 'fallback': 0.65},
+    'USDCAD': {'min': 1.0, 'max': 1.7, 'fallback': 1.36},
+    'XAUUSD': {'min': 1000.0, 'max': 4000.0, 'fallback': 2400.0},
+}
+
+# Generic bounds when the symbol is unknown: the historic "forex price
+# above 5 is an OCR glitch" heuristic
+_DEFAULT_BOUNDS = {'min': 0.0, 'max': 5.0, 'fallback': 1.99}
+
+# Shared read-only sentinel for failed extractions: error paths hand out
+# the same mapping instead of allocating a fresh dict per failure
+_EMPTY_RESULT: Dict[str, Any] = types.MappingProxyType({})
+
+# Upper bounds for the OCR/segment caches; least recently used entries are
+# evicted past these
+_OCR_CACHE_MAX = 128
+_SEGMENT_CACHE_MAX = 512
+
+# Reference label colors (RGB) with a per-color match threshold
+_COLOR_REFS = {
+    'black': {'r': 0, 'g': 0, 'b': 0, 'threshold': 50},
+    'red': {'r': 255, 'g': 0, 'b': 0, 'threshold': 100},
+    'yellow': {'r': 255, 'g': 255, 'b': 0, 'threshold': 100}
+}
+
+class ChartExtract:
+    """Typed accumulator for the values extracted from one chart image.
+
+    Slotted attribute access replaces the string-keyed probing of the old
+    free-form result dict; ``to_dict`` restores the dict shape callers expect.
+    Plain slotted class rather than ``dataclass(slots=True)``, which needs
+    Python 3.10+ while the deployment image runs 3.9.
+    """
+    __slots__ = ('current_price', 'daily_high', 'daily_low', 'weekly_high',
+                 'weekly_low', 'monthly_high', 'monthly_low', 'rsi',
+                 'support_levels', 'resistance_levels')
+
+    def __init__(self) -> None:
+        self.current_price: Optional[float] = None
+        self.daily_high: Optional[float] = None
+        self.daily_low: Optional[float] = None
+        self.weekly_high: Optional[float] = None
+        self.weekly_low: Optional[float] = None
+        self.monthly_high: Optional[float] = None
+        self.monthly_low: Optional[float] = None
+        self.rsi: Optional[float] = None
+        self.support_levels: Optional[List[float]] = None
+        self.resistance_levels: Optional[List[float]] = None
+
+    # Attributes mirrored into the 'price_levels' sub-dict at the boundary
+    _PRICE_LEVEL_FIELDS = ('daily_high', 'daily_low', 'weekly_high',
+                           'weekly_low', 'monthly_high', 'monthly_low')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the result-dict shape the rest of the bot consumes.
+
+        'price_levels' is derived here from the level attributes rather
+        than maintained as a parallel store during extraction, so the two
+        views can never drift apart.
+        """
+        result: Dict[str, Any] = {
+            'price_levels': {name.replace('_', ' '): value
+                             for name in self._PRICE_LEVEL_FIELDS
+                             if (value := getattr(self, name)) is not None}
+        }
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+
 class ChartOCRProcessor:
     """Process chart images using OCR to extract price and indicator data"""
     
@@ -30,7 +197,17 @@ class ChartOCRProcessor:
         
         # We'll only use Google Vision, no fallback needed
         self.api_key = None
-        
+
+        # OCR results keyed by image content hash, so identical screenshots
+        # (e.g. a re-requested chart) skip the Vision API round-trip.
+        # LRU-bounded: every distinct screenshot would otherwise be retained
+        # for the lifetime of the bot
+        self._ocr_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        # Partial results keyed by (segment name, crop hash): unchanged chart
+        # sub-regions are reused even when the candle area differs
+        self._segment_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
         logger.info(f"ChartOCRProcessor initialized with Google Vision API")
 
     def initialize_vision_client(self):
@@ -75,8 +252,10 @@ class ChartOCRProcessor:
         #     if credentials:
         #         # Removed scope specification as it's often handled by the client library or default service account permissions
         #         # scopes=['https://www.googleapis.com/auth/cloud-platform']
-        #         self.vision_client = vision.ImageAnnotatorClient(credentials=credentials)
-        #         logger.info("Google Vision client initialized successfully")
+        #         # Use the gRPC transport (binary protocol, built-in response
+        #         # compression) rather than the REST/JSON fallback
+        #         self.vision_client = vision.ImageAnnotatorClient(credentials=credentials, transport='grpc')
+        #         logger.info("Google Vision client initialized successfully (gRPC transport)")
         #     else:
         #          logger.error(f"Google Vision credentials file not found or invalid: {credentials_path}")
         #          self.vision_client = None
@@ -86,20 +265,29 @@ class ChartOCRProcessor:
         #     self.vision_client = None
         pass # Keep the method structure but do nothing
 
-    async def process_chart_image(self, image_path: str) -> Dict[str, Any]:
+    async def process_chart_image(self, image_path: str, symbol: Optional[str] = None) -> Dict[str, Any]:
         """Process chart image to extract specific price levels based on color and context"""
         if not os.path.exists(image_path):
             logger.error(f"Image file not found: {image_path}")
-            return {}
+            return _EMPTY_RESULT
             
         try:
-            logger.info(f"Processing chart image: {image_path}")
-            
-            # Read the image file
-            with open(image_path, 'rb') as image_file:
-                content = image_file.read()
-            
-            logger.info(f"Image size: {len(content)} bytes")
+            logger.info("Processing chart image: %s", image_path)
+
+            # Read the image file off the event loop thread: handlers keep
+            # serving updates while the disk read is in flight
+            content = await asyncio.to_thread(self._read_image_bytes, image_path)
+
+            logger.info("Image size: %d bytes", len(content))
+
+            # Identical image content yields identical OCR output, so serve
+            # repeats from the cache instead of re-running text detection
+            content_hash = hashlib.sha256(content).hexdigest()
+            cached = self._ocr_cache.get(content_hash)
+            if cached is not None:
+                logger.info("OCR cache hit for %s", image_path)
+                self._ocr_cache.move_to_end(content_hash)
+                return dict(cached)
             
             # Create image object for Google Vision
             # if self.vision_client:
@@ -270,39 +458,23 @@ class ChartOCRProcessor:
             #         label_texts.append(label)
             #         logger.info(f"Found processed label: '{label_text}' at y={label['y1']}")
             
-            # Also detect the approximate color of label texts by requesting image properties
-            # logger.info("Getting image properties to determine label colors...")
-            # image_properties = self.vision_client.image_properties(image=image).image_properties_annotation
-            
-            # For color determination of labels, we'll need to analyze the color at the label position
-            # This is a simple approach - in production you would use more sophisticated color detection
-            # Create a mapping for label color identification
-            color_names = {
-                'black': {'r': 0, 'g': 0, 'b': 0, 'threshold': 50},
-                'red': {'r': 255, 'g': 0, 'b': 0, 'threshold': 100},
-                'yellow': {'r': 255, 'g': 255, 'b': 0, 'threshold': 100}
-            }
-            
+            # Determine label colors by sampling the image at each label's
+            # bounding box rather than guessing from the label text
+            chart_image = await asyncio.to_thread(
+                cv2.imdecode, np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+
             # Process labels with their colors
             # for label in label_texts:
-            #     # In a real implementation, you would extract the color from the image at the label position
-            #     # For now, we'll use a heuristic based on label text
-            #     if 'monthly' in label['text'] or 'month' in label['text']:
-            #         label['color'] = 'black'  # Monthly levels are black
-            #     elif 'weekly' in label['text'] or 'week' in label['text'] or 'supply zone' in label['text']:
-            #         label['color'] = 'red'    # Weekly levels are red
-            #     elif 'daily' in label['text'] or 'day' in label['text']:
-            #         label['color'] = 'yellow' # Daily levels are yellow
-            #     else:
-            #         label['color'] = 'unknown'
-            #         
+            #     label['color'] = self._sample_label_color(
+            #         chart_image, label['x1'], label['y1'], label['x2'], label['y2'])
             #     logger.info(f"Assigned color '{label['color']}' to label '{label['text']}'")
             
             # Find the current price (often has a timestamp below or is in the middle of price scale)
             current_price = None
+            # text_index = self._build_text_index(texts)  # build once, reuse for every price
             # for price in price_texts:
             #     # Check if there's a timestamp below this price
-            #     has_timestamp = self._has_timestamp_below(texts, price['x1'], price['x2'], price['y2'])
+            #     has_timestamp = self._has_timestamp_below(texts, price['x1'], price['x2'], price['y2'], text_index=text_index)
             #     
             #     if has_timestamp:
             #         current_price = price
@@ -313,17 +485,16 @@ class ChartOCRProcessor:
             # if not current_price:
             #     # If we have price texts, take the middle one as estimate
             #     if price_texts:
-            #         # Sort by y position
-            #         sorted_prices = sorted(price_texts, key=lambda p: p['y1'])
-            #         middle_index = len(sorted_prices) // 2
-            #         current_price = sorted_prices[middle_index]
+            #         # Median by y position via O(n) selection, no full sort
+            #         ys = np.array([p['y1'] for p in price_texts])
+            #         middle_index = np.argpartition(ys, len(ys) // 2)[len(ys) // 2]
+            #         current_price = price_texts[middle_index]
             #         logger.info(f"Estimated current price from middle of scale: {current_price['value']}")
             #     else:
             #         logger.error("No prices found to estimate current price")
             #         return {}
             
             # Match labels with corresponding prices based on y-coordinate
-            price_levels = {}
             key_market_levels = {
                 'daily high': {'found': False, 'value': None},
                 'daily low': {'found': False, 'value': None},
@@ -333,121 +504,28 @@ class ChartOCRProcessor:
                 'monthly low': {'found': False, 'value': None}
             }
             
-            # Create a dictionary to track if we've found key market levels
-            abbreviation_mapping = {
-                'daily h': 'daily high',
-                'daily l': 'daily low',
-                'weekly h': 'weekly high',
-                'weekly l': 'weekly low',
-                'monthly h': 'monthly high',
-                'monthly l': 'monthly low',
-                'dly h': 'daily high',
-                'dly l': 'daily low',
-                'wkly h': 'weekly high',
-                'wkly l': 'weekly low',
-                'mth h': 'monthly high',
-                'mth l': 'monthly low',
-                'h': 'high',
-                'l': 'low',
-                'hi': 'high',
-                'lo': 'low'
-            }
-            
-            # Try to find directly visible price values on the chart
-            # Based on the image showing "1.98323"
-            explicit_price_values = {}
-            
-            # for text in texts:
-            #     # Check if text looks like a specific price format (e.g., 1.98323)
-            #     if re.match(r'^\d+\.\d{5}$', text.description):
-            #         try:
-            #             price_value = float(text.description)
-            #             # If this is the specific daily high value we saw in the image
-            #             if abs(price_value - 1.98323) < 0.0001:
-            #                 logger.info(f"Found explicit price value for daily high: {price_value}")
-            #                 explicit_price_values['daily_high'] = price_value
-            #             elif 1.97 <= price_value <= 1.98:
-            #                 logger.info(f"Found explicit price value likely for weekly high: {price_value}")
-            #                 explicit_price_values['weekly_high'] = price_value
-            #         except ValueError:
-            #             pass
-            #         
-            # # Override our values with explicitly detected ones
-            # for key, value in explicit_price_values.items():
-            #     result_dict[key] = value
-            #     # Also update the price_levels
-            #     if key == 'daily_high':
-            #         result_dict['price_levels']['daily high'] = value
-            #     elif key == 'weekly_high':
-            #         result_dict['price_levels']['weekly high'] = value
-            
             # Try to find daily/weekly/monthly high/low values
-            result_dict = {
-                'price_levels': {}
-            }
+            extract = ChartExtract()
+
+            # Merge in results from sub-regions that are byte-identical to a
+            # previously processed chart (price axis, legend, timestamp strip)
+            segment_digests = self._segment_digests(chart_image)
+            for segment_name, digest in segment_digests.items():
+                cached_segment = self._segment_cache.get((segment_name, digest))
+                if cached_segment:
+                    logger.info("Segment cache hit for %s", segment_name)
+                    self._segment_cache.move_to_end((segment_name, digest))
+                    for key, value in cached_segment.items():
+                        setattr(extract, key, value)
             
             # First try to match important market levels (daily/weekly/monthly high/low)
             # for label in label_texts:
             #     label_text = label['text']
             #     label_color = label.get('color', 'unknown')
             #     logger.info(f"Processing label: '{label_text}' with color: {label_color}")
-            #     
-            #     # Try to normalize labels like "weekly hi" to "weekly high"
-            #     normalized_text = label_text
-            #     if 'hi' in label_text and not 'high' in label_text:
-            #         normalized_text = label_text.replace('hi', 'high')
-            #     if 'lo' in label_text and not 'low' in label_text:
-            #         normalized_text = label_text.replace('lo', 'low')
-            #         
-            #     # Check for common abbreviations
-            #     if normalized_text in abbreviation_mapping:
-            #         normalized_text = abbreviation_mapping[normalized_text]
-            #         
-            #     # Use color information for better classification
-            #     if 'monthly' not in normalized_text and 'month' not in normalized_text and label_color == 'black':
-            #         # If it's black color and contains high/low indicators, it's likely a monthly level
-            #         if any(term in normalized_text for term in ['high', 'h', 'hi']):
-            #             normalized_text = 'monthly high'
-            #         elif any(term in normalized_text for term in ['low', 'l', 'lo']):
-            #             normalized_text = 'monthly low'
-            #         
-            #     if 'weekly' not in normalized_text and 'week' not in normalized_text and label_color == 'red':
-            #         # If it's red color and contains high/low indicators, it's likely a weekly level
-            #         if any(term in normalized_text for term in ['high', 'h', 'hi']):
-            #             normalized_text = 'weekly high'
-            #         elif any(term in normalized_text for term in ['low', 'l', 'lo']):
-            #             normalized_text = 'weekly low'
-            #         # Special case for "supply zone" which is often a weekly level in red
-            #         elif 'supply' in normalized_text or 'zone' in normalized_text:
-            #             normalized_text = 'weekly high'
-            #         
-            #     if 'daily' not in normalized_text and 'day' not in normalized_text and label_color == 'yellow':
-            #         # If it's yellow color and contains high/low indicators, it's likely a daily level
-            #         if any(term in normalized_text for term in ['high', 'h', 'hi']):
-            #             normalized_text = 'daily high'
-            #         elif any(term in normalized_text for term in ['low', 'l', 'lo']):
-            #             normalized_text = 'daily low'
-            #         
-            #     # Afzonderlijke termen matchen als ze niet samen voorkomen
-            #     if ('daily' in normalized_text or 'day' in normalized_text or 'dly' in normalized_text) and \
-            #        ('h ' in f"{normalized_text} " or 'high' in normalized_text):  # ensure 'h' is a separate word
-            #         normalized_text = 'daily high'
-            #     elif ('daily' in normalized_text or 'day' in normalized_text or 'dly' in normalized_text) and \
-            #          ('l ' in f"{normalized_text} " or 'low' in normalized_text):
-            #         normalized_text = 'daily low'
-            #     elif ('weekly' in normalized_text or 'week' in normalized_text or 'wkly' in normalized_text) and \
-            #          ('h ' in f"{normalized_text} " or 'high' in normalized_text):
-            #         normalized_text = 'weekly high'
-            #     elif ('weekly' in normalized_text or 'week' in normalized_text or 'wkly' in normalized_text) and \
-            #          ('l ' in f"{normalized_text} " or 'low' in normalized_text):
-            #         normalized_text = 'weekly low'
-            #     elif ('monthly' in normalized_text or 'month' in normalized_text or 'mth' in normalized_text) and \
-            #          ('h ' in f"{normalized_text} " or 'high' in normalized_text):
-            #         normalized_text = 'monthly high'
-            #     elif ('monthly' in normalized_text or 'month' in normalized_text or 'mth' in normalized_text) and \
-            #          ('l ' in f"{normalized_text} " or 'low' in normalized_text):
-            #         normalized_text = 'monthly low'
-            #         
+            #
+            #     normalized_text = self._normalize_label(label_text, label_color)
+            #
             #     # Now find the closest price to this label
             #     if normalized_text in key_market_levels and not key_market_levels[normalized_text]['found']:
             #         # Find closest price text vertically on the left side
@@ -506,20 +584,17 @@ class ChartOCRProcessor:
             #             
             #             # Add to result dict
             #             if normalized_text == 'daily high':
-            #                 result_dict['daily_high'] = closest_price['value']
+            #                 extract.daily_high = closest_price['value']
             #             elif normalized_text == 'daily low':
-            #                 result_dict['daily_low'] = closest_price['value']
+            #                 extract.daily_low = closest_price['value']
             #             elif normalized_text == 'weekly high':
-            #                 result_dict['weekly_high'] = closest_price['value']
+            #                 extract.weekly_high = closest_price['value']
             #             elif normalized_text == 'weekly low':
-            #                 result_dict['weekly_low'] = closest_price['value']
+            #                 extract.weekly_low = closest_price['value']
             #             elif normalized_text == 'monthly high':
-            #                 result_dict['monthly_high'] = closest_price['value']
+            #                 extract.monthly_high = closest_price['value']
             #             elif normalized_text == 'monthly low':
-            #                 result_dict['monthly_low'] = closest_price['value']
-            #             
-            #             # Also add to price_levels
-            #             result_dict['price_levels'][normalized_text] = closest_price['value']
+            #                 extract.monthly_low = closest_price['value']
             #             
             #             logger.info(f"Found {normalized_text}: {closest_price['value']} (color: {label_color})")
             
@@ -533,165 +608,296 @@ class ChartOCRProcessor:
             # Also look for price indicators and RSI
             # Process the current price
             # if current_price:
-            #     result_dict['current_price'] = current_price['value']
+            #     extract.current_price = current_price['value']
             #     logger.info(f"Current price identified as {current_price['value']}")
             
             # Extract RSI if available
             rsi_value = None
-            rsi_patterns = [
-                r'RSI\D*(\d+\.?\d*)',  # RSI: 50.5 or RSI 50.5
-                r'RSI.*?(\d+)',  # RSI followed by number
-                r'rsi.*?(\d+)'   # lowercase rsi
-            ]
-            
+
             # for text in texts:
             #     if rsi_value:
             #         break
-            #         
-            #     for pattern in rsi_patterns:
-            #         match = re.search(pattern, text.description, re.IGNORECASE)
+            #
+            #     for pattern in _RSI_RES:
+            #         match = pattern.search(text.description)
             #         if match:
             #             try:
             #                 rsi_value = float(match.group(1))
             #                 logger.info(f"Found RSI value: {rsi_value}")
-            #                 result_dict['rsi'] = rsi_value
+            #                 extract.rsi = rsi_value
             #                 break
             #             except (ValueError, IndexError):
             #                 continue
             
-            # After extracting all data, let's add one more verification check
-            # The images show that daily high is 1.98323 - so we should check if our detected value matches
-            # if 'daily_high' in result_dict:
-            #     daily_high = result_dict['daily_high']
-            #     # Check if the daily high value seems reasonable
-            #     # In the image, it's around 1.9850, so we'll check if it's in that range
-            #     if not (1.98 <= daily_high <= 1.99):
-            #         logger.warning(f"Daily high value {daily_high} seems suspicious, checking price texts directly")
-            #         # Try to find the correct value from all detected prices
-            #         for price in price_texts:
-            #             if 1.98 <= price['value'] <= 1.99:
-            #                 logger.info(f"Found better daily high value: {price['value']}")
-            #                 result_dict['daily_high'] = price['value']
-            #                 result_dict['price_levels']['daily high'] = price['value']
-            #                 break
-            
-            # Also check support/resistance classification for reasonableness
-            # if 'current_price' in result_dict and 'daily_high' in result_dict:
-            #     current_price = result_dict['current_price']
-            #     daily_high = result_dict['daily_high']
-            #     
-            #     # In a bullish trend, current price should be above or close to daily high
-            #     if current_price > daily_high * 1.01:  # Current price is 1% above daily high
-            #         logger.warning(f"Current price {current_price} much higher than daily high {daily_high}, fixing...")
-            #         # Adjust current price to be just below daily high in a bullish market
-            #         result_dict['current_price'] = daily_high * 0.998  # Just slightly below
-
-            # Convert support/resistance into lists
-            support_levels = []
-            resistance_levels = []
-            
-            # If we have current price, we can classify levels properly
-            # if 'current_price' in result_dict:
-            #     current_price_value = result_dict['current_price']
-            #     
-            #     # Ensure current price is realistic for EURUSD
-            #     if current_price_value > 5:  # Unrealistic for EURUSD
-            #         logger.warning(f"Current price {current_price_value} unrealistic for EURUSD, adjusting...")
-            #         # Set current price to slightly below daily high if available
-            #         if 'daily_high' in result_dict:
-            #             current_price_value = result_dict['daily_high'] * 0.998
-            #             result_dict['current_price'] = current_price_value
-            #         else:
-            #             # Use a more realistic value
-            #             current_price_value = 1.99
-            #             result_dict['current_price'] = current_price_value
-            #     
-            #     # Make sure support levels are BELOW current price and resistance levels are ABOVE
-            #     # Add all found market levels appropriately
-            #     if 'daily_low' in result_dict:
-            #         if result_dict['daily_low'] < current_price_value:
-            #             support_levels.append(result_dict['daily_low'])
-            #         else:
-            #             logger.warning(f"Daily low {result_dict['daily_low']} is above current price, fixing classification")
-            #             resistance_levels.append(result_dict['daily_low'])
-            #     
-            #     if 'weekly_low' in result_dict:
-            #         if result_dict['weekly_low'] < current_price_value:
-            #             support_levels.append(result_dict['weekly_low'])
-            #         else:
-            #             resistance_levels.append(result_dict['weekly_low'])
-            #     
-            #     if 'monthly_low' in result_dict:
-            #         if result_dict['monthly_low'] < current_price_value:
-            #             support_levels.append(result_dict['monthly_low'])
-            #         else:
-            #             resistance_levels.append(result_dict['monthly_low'])
-            #     
-            #     if 'daily_high' in result_dict:
-            #         if result_dict['daily_high'] > current_price_value:
-            #             resistance_levels.append(result_dict['daily_high'])
-            #         else:
-            #             logger.warning(f"Daily high {result_dict['daily_high']} is below current price, fixing classification")
-            #             support_levels.append(result_dict['daily_high'])
-            #     
-            #     if 'weekly_high' in result_dict:
-            #         if result_dict['weekly_high'] > current_price_value:
-            #             resistance_levels.append(result_dict['weekly_high'])
-            #         else:
-            #             support_levels.append(result_dict['weekly_high'])
-            #     
-            #     if 'monthly_high' in result_dict:
-            #         if result_dict['monthly_high'] > current_price_value:
-            #             resistance_levels.append(result_dict['monthly_high'])
-            #         else:
-            #             support_levels.append(result_dict['monthly_high'])
-            #     
-            #     # Log what we found
-            #     logger.info(f"Support levels before sorting: {support_levels}")
-            #     logger.info(f"Resistance levels before sorting: {resistance_levels}")
-            
-            # Add support/resistance to the result dictionary
-            # if support_levels:
-            #     result_dict['support_levels'] = sorted(support_levels)
-            #     
-            # if resistance_levels:
-            #     result_dict['resistance_levels'] = sorted(resistance_levels)
-            
+            # Apply all post-extraction consistency fixes in one traversal
+            self._apply_sanity_fixes(extract, symbol)
+
+            # Classify the extracted levels against the current price in one
+            # vectorized pass: everything below is support, everything above
+            # is resistance, replacing the per-level if/else cascade. Skip
+            # the whole block when there is no price or no level to classify.
+            if extract.current_price is not None and any(
+                    getattr(extract, key) is not None for key in self._LEVEL_KEYS):
+                support_levels, resistance_levels = self._classify_levels(
+                    extract.current_price, extract)
+
+                if support_levels:
+                    extract.support_levels = support_levels
+                if resistance_levels:
+                    extract.resistance_levels = resistance_levels
+
             # Log final results
             # if result_dict:
             #     logger.info(f"Extracted data: {result_dict}")
             # else:
             #     logger.warning("No data could be extracted from the chart")
-            
+
+            # Remember what each sub-region contributed for the next chart
+            for segment_name, digest in segment_digests.items():
+                keys = _SEGMENT_REGIONS[segment_name][1]
+                fragment = {key: getattr(extract, key) for key in keys
+                            if getattr(extract, key) is not None}
+                if fragment:
+                    self._segment_cache[(segment_name, digest)] = fragment
+                    if len(self._segment_cache) > _SEGMENT_CACHE_MAX:
+                        self._segment_cache.popitem(last=False)
+
+            result_dict = extract.to_dict()
+            self._ocr_cache[content_hash] = dict(result_dict)
+            if len(self._ocr_cache) > _OCR_CACHE_MAX:
+                self._ocr_cache.popitem(last=False)
             return result_dict
-            
-        except Exception as e:
-            logger.error(f"Error processing chart image: {str(e)}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            return {}
+
+        except Exception:
+            # logger.exception formats the traceback lazily, only when the
+            # record is actually emitted
+            logger.exception("Error processing chart image")
+            return _EMPTY_RESULT
     
-    def _has_timestamp_below(self, texts, x1, x2, y2, max_distance=20):
+    def _apply_sanity_fixes(self, extract: ChartExtract,
+                            symbol: Optional[str] = None) -> ChartExtract:
+        """Fix up inconsistent extraction results in a single pass.
+
+        The separate verification passes (unrealistic current price, price
+        sitting far above the daily high) are fused here so the extract is
+        read once and each fix sees the effect of the previous one. The
+        plausibility bounds come from the per-symbol table when the symbol
+        is known.
+        """
+        current_price = extract.current_price
+        if current_price is None:
+            return extract
+
+        bounds = _SYMBOL_BOUNDS.get(symbol.upper(), _DEFAULT_BOUNDS) if symbol else _DEFAULT_BOUNDS
+        daily_high = extract.daily_high
+
+        # OCR occasionally glues digits together producing absurd prices
+        if not bounds['min'] <= current_price <= bounds['max']:
+            logger.warning("Current price %s outside plausible range for %s, adjusting...",
+                           current_price, symbol or 'unknown symbol')
+            current_price = daily_high * 0.998 if daily_high else bounds['fallback']
+            extract.current_price = current_price
+
+        # The current price should not sit far above the daily high
+        if daily_high and current_price > daily_high * 1.01:
+            logger.warning("Current price %s much higher than daily high %s, fixing...", current_price, daily_high)
+            extract.current_price = daily_high * 0.998
+
+        return extract
+
+    # Result keys holding the extracted market levels, in one place so the
+    # classification pass stays in sync with the extraction above
+    _LEVEL_KEYS = ('daily_low', 'weekly_low', 'monthly_low',
+                   'daily_high', 'weekly_high', 'monthly_high')
+
+    def _classify_levels(self, current_price: float, extract: ChartExtract,
+                         max_levels: Optional[int] = None):
+        """Split the extracted levels into sorted support/resistance lists.
+
+        A single NumPy comparison against the current price classifies all
+        levels at once; levels below the price are support, levels above
+        are resistance. When max_levels is given, np.partition selects the
+        levels nearest the price in O(n) before only those are sorted.
+        """
+        values = np.array([value for key in self._LEVEL_KEYS
+                           if (value := getattr(extract, key)) is not None],
+                          dtype=np.float64)
+        if values.size == 0:
+            return [], []
+
+        below = values < current_price
+        support_values = values[below]
+        resistance_values = values[~below]
+
+        if max_levels is not None:
+            if support_values.size > max_levels:
+                # Nearest supports are the largest values below the price
+                split = support_values.size - max_levels
+                support_values = np.partition(support_values, split)[split:]
+            if resistance_values.size > max_levels:
+                # Nearest resistances are the smallest values above the price
+                resistance_values = np.partition(resistance_values, max_levels - 1)[:max_levels]
+
+        support = np.sort(support_values).tolist()
+        resistance = np.sort(resistance_values).tolist()
+        return support, resistance
+
+    @staticmethod
+    def _segment_digests(chart_image) -> Dict[str, str]:
+        """Hash the fixed chart sub-regions (price axis, legend, timestamp strip)."""
+        digests = {}
+        if chart_image is None:
+            return digests
+        height, width = chart_image.shape[:2]
+        for name, (box, _keys) in _SEGMENT_REGIONS.items():
+            x1, y1 = int(box[0] * width), int(box[1] * height)
+            x2, y2 = int(box[2] * width), int(box[3] * height)
+            crop = np.ascontiguousarray(chart_image[y1:y2, x1:x2])
+            digests[name] = hashlib.sha256(crop.tobytes()).hexdigest()
+        return digests
+
+    @staticmethod
+    def _sample_label_color(image, x1: int, y1: int, x2: int, y2: int) -> str:
+        """Classify the dominant color inside a label bounding box.
+
+        Takes the median BGR value of the crop in one vectorized numpy pass
+        and matches it against the reference label colors.
+        """
+        if image is None:
+            return 'unknown'
+        height, width = image.shape[:2]
+        x1, x2 = max(0, x1), min(width, x2)
+        y1, y2 = max(0, y1), min(height, y2)
+        if x2 <= x1 or y2 <= y1:
+            return 'unknown'
+
+        # Median is robust against the anti-aliased text pixels in the crop
+        b, g, r = np.median(image[y1:y2, x1:x2].reshape(-1, 3), axis=0)
+
+        best_name, best_distance = 'unknown', float('inf')
+        for name, ref in _COLOR_REFS.items():
+            distance = abs(r - ref['r']) + abs(g - ref['g']) + abs(b - ref['b'])
+            if distance < ref['threshold'] * 3 and distance < best_distance:
+                best_name, best_distance = name, distance
+        return best_name
+
+    @staticmethod
+    def _read_image_bytes(image_path: str) -> bytes:
+        """Read an image file in buffered chunks directly into a bytearray."""
+        buffer = bytearray()
+        with open(image_path, 'rb') as image_file:
+            while True:
+                chunk = image_file.read(io.DEFAULT_BUFFER_SIZE)
+                if not chunk:
+                    break
+                buffer.extend(chunk)
+        return bytes(buffer)
+
+    async def process_chart_images(self, image_paths: List[str], max_concurrency: int = 4) -> List[Dict[str, Any]]:
+        """Process multiple chart images concurrently.
+
+        Runs process_chart_image for each path under asyncio.gather with a
+        bounded semaphore so several OCR requests are in flight at once
+        without overloading the Vision API or local resources.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def process_one(image_path: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.process_chart_image(image_path)
+
+        return await asyncio.gather(*(process_one(path) for path in image_paths))
+
+    def _normalize_label(self, label_text: str, label_color: str = 'unknown') -> str:
+        """Normalize an OCR'd level label to its canonical name.
+
+        A single precompiled alternation over the period ("daily"/"wkly"/...)
+        and side ("high"/"h"/...) vocabularies replaces the old cascade of
+        chained substring checks; the abbreviation table handles the exact
+        short forms that carry no period word.
+        """
+        normalized = label_text.translate(_LABEL_TRANSLATE).strip()
+
+        # Exact abbreviations like "dly h" map straight to the canonical name
+        normalized = _ABBREVIATION_MAPPING.get(normalized, normalized)
+
+        # One regex pass decides both the period and the side
+        match = _PERIOD_SIDE_RE.search(normalized)
+        if match:
+            period = _PERIOD_CANONICAL[match.group('period')]
+            side = _SIDE_CANONICAL[match.group('side')]
+            return f"{period} {side}"
+
+        # No period word: fall back to the label color to supply the period
+        period = _COLOR_PERIOD.get(label_color)
+        if period:
+            side_match = _SIDE_RE.search(normalized)
+            if side_match:
+                return f"{period} {_SIDE_CANONICAL[side_match.group(1)]}"
+            # Red "supply zone" markers behave like a weekly high
+            if period == 'weekly' and ('supply' in normalized or 'zone' in normalized):
+                return 'weekly high'
+
+        return normalized
+
+    def _build_text_index(self, texts):
+        """Build a spatial index of text blocks sorted by their top y-coordinate.
+
+        Parsing the bounding boxes once and sorting by y1 lets callers use
+        np.searchsorted to find candidates in a vertical band instead of
+        scanning every text block per price (O(P·N) -> O(P·log N + hits)).
+        """
+        boxes = []
+        for text in texts:
+            # Cheap attribute test first: blocks without text can never match
+            # a timestamp, so skip them before unpacking their vertex lists
+            if not text.description:
+                continue
+            # One descriptor walk per text: Vision polys are axis-aligned
+            # quads, so the four vertices can be read off directly
+            v = text.bounding_poly.vertices
+            xs = (v[0].x, v[1].x, v[2].x, v[3].x)
+            ys = (v[0].y, v[1].y, v[2].y, v[3].y)
+            boxes.append(_TextBox(min(ys), min(xs), max(xs), max(ys), text))
+        boxes.sort(key=lambda b: b.y1)
+        # Structure-of-arrays layout: the y index drives searchsorted and the
+        # x arrays let the alignment test run as one vectorized comparison
+        text_y1 = np.array([b.y1 for b in boxes])
+        text_x1 = np.array([b.x1 for b in boxes])
+        text_x2 = np.array([b.x2 for b in boxes])
+        return boxes, text_y1, text_x1, text_x2
+
+    def _has_timestamp_below(self, texts, x1, x2, y2, max_distance=20, text_index=None):
         """Check if there's a timestamp-like text below the price"""
         try:
-            for text in texts:
-                # Get text position
-                x_coords = [vertex.x for vertex in text.bounding_poly.vertices]
-                y_coords = [vertex.y for vertex in text.bounding_poly.vertices]
-                text_x1 = min(x_coords)
-                text_x2 = max(x_coords)
-                text_y1 = min(y_coords)
-                
-                # Check if text is below the price and horizontally aligned
-                if (text_y1 > y2 and text_y1 <= y2 + max_distance and
-                    text_x1 >= x1 - max_distance and text_x2 <= x2 + max_distance):
-                    # Check if text matches timestamp pattern (e.g., "32:49")
-                    if re.match(r'\d{2}:\d{2}', text.description):
-                        logger.debug(f"Found timestamp: {text.description} below price at y={y2}")
-                        return True
-            
+            # Use the precomputed sorted-by-y index when available so we only
+            # examine texts inside the narrow vertical band below the price
+            if text_index is None:
+                if not texts:
+                    return False
+                text_index = self._build_text_index(texts)
+            boxes, text_y1, text_x1, text_x2 = text_index
+
+            lo = np.searchsorted(text_y1, y2, side='right')
+            hi = np.searchsorted(text_y1, y2 + max_distance, side='right')
+            if lo == hi:
+                return False
+
+            # One vectorized comparison over the band selects the horizontally
+            # aligned candidates; only those reach the regex
+            aligned = np.flatnonzero((text_x1[lo:hi] >= x1 - max_distance) &
+                                     (text_x2[lo:hi] <= x2 + max_distance))
+            for offset in aligned:
+                box = boxes[lo + offset]
+                # Check if text matches timestamp pattern (e.g., "32:49"):
+                # fast digit check first, regex only for date-like forms
+                description = box.text.description
+                if _looks_like_time(description) or _TS_RE.search(description):
+                    logger.debug("Found timestamp: %s below price at y=%s", description, y2)
+                    return True
+
             return False
-            
+
         except Exception as e:
             logger.error(f"Error checking for timestamp: {str(e)}")
             return False
@@ -699,8 +905,7 @@ class ChartOCRProcessor:
     def process_image(self, image_path):
         logger.info(f"Processing image: {image_path}")
         try:
-            with open(image_path, 'rb') as image_file:
-                content = image_file.read()
+            content = self._read_image_bytes(image_path)
 
             # Always use Tesseract for now as Vision is disabled
             # if self.vision_client:
@@ -748,13 +953,21 @@ class ChartOCRProcessor:
             logger.error(f"Error processing image {image_path}: {str(e)}")
             # Fallback to Tesseract on any unexpected error during Vision processing attempt
             try:
-                with open(image_path, 'rb') as image_file:
-                    content = image_file.read()
+                content = self._read_image_bytes(image_path)
                 return self.process_with_tesseract(image_path, content)
             except Exception as te:
                 logger.error(f"Error during Tesseract fallback for {image_path}: {str(te)}")
                 return None
 
+    async def process_image_async(self, image_path):
+        """Run the blocking Tesseract/Vision pipeline in a worker thread.
+
+        process_image does file I/O and (when enabled) a synchronous OCR
+        call; dispatching it through asyncio.to_thread keeps the Telegram
+        event loop responsive while the OCR runs.
+        """
+        return await asyncio.to_thread(self.process_image, image_path)
+
     def process_with_tesseract(self, image_path, image_content=None):
         # Implementation of process_with_tesseract method
         pass
@@ -2,6 +2,9 @@ import os
 import logging
 import asyncio
 import json # Needed for localStorage init script
+import time # Needed for the analysis TTL cache
+import base64 # Needed to decode raw CDP screenshot payloads
+from functools import lru_cache
 from typing import Optional, Dict
 from io import BytesIO
 from trading_bot.services.chart_service.tradingview import TradingViewService
@@ -71,6 +74,118 @@ TV_LOCAL_STORAGE = {
     'notification_shown': 'true'
 }
 
+# Serialized once at import time for the init script below
+_TV_LOCAL_STORAGE_JSON = json.dumps(TV_LOCAL_STORAGE)
+
+# Context init script: runs before any page script on every navigation.
+# Fuses the localStorage seeding, popup blocking and dialog-hiding CSS
+# into one script so no per-page add_style_tag round-trip is needed.
+_INIT_SCRIPT = f"""
+    // Set localStorage items
+    const tvLocalStorage = {_TV_LOCAL_STORAGE_JSON};
+    for (const [key, value] of Object.entries(tvLocalStorage)) {{
+        try {{ localStorage.setItem(key, value); }} catch (e) {{}}
+    }}
+    // Block popups
+    window.open = () => null;
+    window.confirm = () => true;
+    window.alert = () => {{}};
+    // Inject the dialog-hiding CSS as soon as the document exists
+    const hideDialogsCss = {json.dumps(HIDE_DIALOGS_CSS)};
+    const injectCss = () => {{
+        try {{
+            const style = document.createElement('style');
+            style.textContent = hideDialogsCss;
+            document.documentElement.appendChild(style);
+        }} catch (e) {{}}
+    }};
+    if (document.readyState === 'loading') {{
+        document.addEventListener('DOMContentLoaded', injectCss);
+    }} else {{
+        injectCss();
+    }}
+"""
+
+# Post-goto cleanup: dismiss any popups that slipped past the init
+# script and CSS. localStorage seeding is NOT repeated here — the init
+# script already runs on every navigation.
+_POST_GOTO_SCRIPT = """
+    document.dispatchEvent(new KeyboardEvent('keydown', { key: 'Escape', keyCode: 27 }));
+    document.querySelectorAll('button.close-B02UUUN3, button[data-name="close"], .nav-button-znwuaSC1').forEach(btn => {
+        try { btn.click(); } catch (e) {}
+    });
+    document.querySelectorAll('[role="dialog"], .tv-dialog, .js-dialog, .tv-dialog--popup').forEach(dialog => {
+        dialog.style.display = 'none';
+    });
+"""
+
+
+# Subresources that never contribute to the chart canvas: decorative
+# images, webfonts, media and tracking beacons are aborted at the
+# routing layer so their bytes never cross the wire
+_BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'media'})
+_BLOCKED_URL_MARKERS = ('analytics', 'telemetry', 'doubleclick', 'hotjar')
+
+
+async def _abort_non_essential(route):
+    """Route handler dropping resources a chart screenshot never needs."""
+    request = route.request
+    if (request.resource_type in _BLOCKED_RESOURCE_TYPES
+            or any(marker in request.url for marker in _BLOCKED_URL_MARKERS)):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+# In-page scan over the analysis widget selectors: returns the first
+# usable text in one round-trip instead of a locator wait per selector
+_ANALYSIS_TEXT_SCRIPT = """
+    () => {
+        const selectors = [
+            "div[data-widget-name='Technical Analysis'] .container-zF547vzy",
+            ".tv-symbol-technicals-widget__summary-text",
+            ".tv-symbol-profile__description"
+        ];
+        for (const sel of selectors) {
+            const el = document.querySelector(sel);
+            if (el) {
+                const text = el.innerText.trim();
+                if (text.length > 20) return text;
+            }
+        }
+        return null;
+    }
+"""
+
+
+# One in-page pass over all close-button candidates: a single CDP call
+# replaces the per-selector query/visibility/click round-trips. The
+# "Got it" confirmation needs a text check since :has-text() is
+# Playwright-only, not valid CSS.
+_CLOSE_BUTTONS_SCRIPT = """
+    () => {
+        let clicked = 0;
+        const visible = el => el.offsetParent !== null;
+        const selector = 'button.close-B02UUUN3, button[data-name="close"], button[aria-label*="Close"]';
+        document.querySelectorAll(selector).forEach(btn => {
+            if (!visible(btn)) return;
+            try { btn.click(); clicked += 1; } catch (e) {}
+        });
+        document.querySelectorAll('button').forEach(btn => {
+            if (visible(btn) && btn.textContent.trim() === 'Got it') {
+                try { btn.click(); clicked += 1; } catch (e) {}
+            }
+        });
+        return clicked;
+    }
+"""
+
+
+@lru_cache(maxsize=256)
+def _normalize_symbol(symbol: str) -> str:
+    """Map a raw symbol spelling ("EUR/USD") to its chart-link key form."""
+    return symbol.replace("/", "").upper()
+
 
 class TradingViewNodeService(TradingViewService):
     def __init__(self, session_id=None):
@@ -83,6 +198,24 @@ class TradingViewNodeService(TradingViewService):
         self.browser = None
         self.context = None
 
+        # Warm pool of pre-created pages: checkout/return amortizes the
+        # Chromium frame and renderer setup cost across screenshots
+        self._page_pool: Optional[asyncio.Queue] = None
+        self._pool_size = int(os.getenv("TV_PAGE_POOL_SIZE", "4"))
+
+        # Cap in-flight screenshots: simultaneous captures on one browser
+        # queue behind each other, so admit only N at a time
+        self._sema = asyncio.Semaphore(int(os.getenv("TV_MAX_CONCURRENT", "4")))
+
+        # Persistent profile directory: keeps cookies, localStorage, the
+        # HTTP cache and compiled JS code cache across restarts
+        self._user_data_dir = os.getenv("TV_USER_DATA_DIR", "tv_user_data")
+
+        # The analysis summary changes at most once a minute; repeated
+        # requests within the TTL skip the browser entirely
+        self._analysis_cache: Dict[tuple, tuple] = {}
+        self._analysis_cache_ttl = float(os.getenv("TV_ANALYSIS_CACHE_TTL", "60"))
+
         # Mapping van timeframes naar TradingView interval waarden remains the same
         self.interval_map = {
             "1m": "1", "3m": "3", "5m": "5", "15m": "15", "30m": "30",
@@ -164,8 +297,8 @@ class TradingViewNodeService(TradingViewService):
             
             # Check if Chromium browser is available, attempt install if not (might need user intervention)
             try:
-                self.browser = await self.playwright.chromium.launch(headless=True)
-                logger.info("Chromium browser launched successfully.")
+                self.context = await self._launch_persistent_context()
+                logger.info("Chromium persistent context launched successfully.")
             except PlaywrightError as e:
                 logger.error(f"Failed to launch Chromium: {e}. Attempting to install...")
                 # Try running the install command - this might fail depending on permissions
@@ -177,7 +310,7 @@ class TradingViewNodeService(TradingViewService):
                     stdout, stderr = await process.communicate()
                     if process.returncode == 0:
                         logger.info("Playwright Chromium installed successfully.")
-                        self.browser = await self.playwright.chromium.launch(headless=True)
+                        self.context = await self._launch_persistent_context()
                     else:
                         logger.error(f"Failed to automatically install Chromium. Stdout: {stdout.decode()}, Stderr: {stderr.decode()}")
                         raise RuntimeError("Chromium installation failed.") from e
@@ -185,9 +318,14 @@ class TradingViewNodeService(TradingViewService):
                      logger.error(f"Could not install Chromium automatically: {install_e}. Please run 'python -m playwright install chromium' manually.")
                      return False
 
-            # Create a persistent context to reuse cookies/localStorage
+            # Configure the persistent context (cookies, scripts, page pool)
             await self._create_browser_context()
 
+            # Warm connections to the hot chart URLs in the background so
+            # the first real screenshot skips DNS/TLS setup
+            if self.context:
+                asyncio.create_task(self._warmup_connections())
+
             self.is_initialized = True
             logger.info("Playwright service initialized successfully.")
             return True
@@ -196,26 +334,32 @@ class TradingViewNodeService(TradingViewService):
             await self.cleanup() # Attempt cleanup on failure
             return False
 
+    async def _launch_persistent_context(self):
+        """Launch Chromium with a persistent user-data directory.
+
+        The on-disk profile keeps TradingView's HTTP cache, compiled JS
+        code cache, cookies and localStorage across restarts, which cuts
+        the cold-start subresource cost of the first screenshot.
+        """
+        context = await self.playwright.chromium.launch_persistent_context(
+            self._user_data_dir,
+            headless=True,
+            locale='en-US',
+            timezone_id='Europe/Amsterdam',
+            viewport={'width': 1920, 'height': 1080},
+            bypass_csp=True,
+            # user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+        )
+        return context
+
     async def _create_browser_context(self):
-        """Creates a browser context with necessary settings and cookies."""
-        if not self.browser:
-             logger.error("Browser not available to create context.")
+        """Configures the persistent context with cookies, scripts and the page pool."""
+        if not self.context:
+             logger.error("Persistent context not available to configure.")
              return
-             
+
         try:
-            # Close existing context if any
-            if self.context:
-                await self.context.close()
-                
-            self.context = await self.browser.new_context(
-                locale='en-US',
-                timezone_id='Europe/Amsterdam',
-                viewport={'width': 1920, 'height': 1080},
-                bypass_csp=True,
-                # user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-            )
-            
-            # Add session cookie if provided
+            # Add session cookie if provided (idempotent on the persisted profile)
             if self.session_id:
                 logger.info(f"Adding TradingView session cookie (ID: {self.session_id[:5]}...).")
                 await self.context.add_cookies([
@@ -231,26 +375,137 @@ class TradingViewNodeService(TradingViewService):
                 ])
                 
             # Add initial script to set localStorage and block popups
-            await self.context.add_init_script(f"""
-                // Set localStorage items
-                const tvLocalStorage = {json.dumps(TV_LOCAL_STORAGE)};
-                for (const [key, value] of Object.entries(tvLocalStorage)) {{
-                    try {{ localStorage.setItem(key, value); }} catch (e) {{}}
-                }}
-                // Block popups
-                window.open = () => null;
-                window.confirm = () => true;
-                window.alert = () => {{}};
-            """)
-            logger.info("Browser context created with cookies and init script.")
-            
+            await self.context.add_init_script(_INIT_SCRIPT)
+
+            # Drop images/fonts/media and tracking requests context-wide
+            await self.context.route("**/*", _abort_non_essential)
+            logger.info("Browser context configured with cookies and init script.")
+
+            # Pre-create a small pool of pages on the context
+            self._page_pool = asyncio.Queue()
+            for _ in range(self._pool_size):
+                self._page_pool.put_nowait(await self._new_pooled_page())
+
         except Exception as e:
             logger.error(f"Error creating browser context: {e}", exc_info=True)
             self.context = None
+            self._page_pool = None
+
+    # Symbols most likely to be requested first; their chart URLs are
+    # fetched at startup to warm DNS, TLS session tickets and HTTP cache
+    _WARMUP_SYMBOLS = ('EURUSD', 'GBPUSD', 'USDJPY', 'XAUUSD', 'BTCUSD', 'US500')
+
+    async def _warmup_connections(self):
+        """Pre-fetch a handful of chart URLs concurrently to front-load handshakes."""
+        try:
+            urls = [self.chart_links[symbol] for symbol in self._WARMUP_SYMBOLS
+                    if symbol in self.chart_links]
+            results = await asyncio.gather(
+                *(self.context.request.fetch(url) for url in urls),
+                return_exceptions=True)
+            ok = sum(1 for r in results if not isinstance(r, Exception))
+            logger.info(f"Connection warmup finished ({ok}/{len(urls)} fetches succeeded).")
+        except Exception as e:
+            logger.warning(f"Connection warmup failed: {e}")
+
+    async def _cdp_screenshot(self, page, clip=None):
+        """Capture a screenshot via a raw CDP Page.captureScreenshot call.
+
+        Bypasses Playwright's screenshot wrapper (protocol validation,
+        actionability checks, result marshalling) for the cases that need
+        neither, handing the JPEG back in a single round-trip. The CDP
+        session is cached on the page so pooled pages pay for it once.
+        """
+        cdp = getattr(page, '_cdp_session', None)
+        if cdp is None:
+            cdp = await self.context.new_cdp_session(page)
+            page._cdp_session = cdp
+        params = {'format': 'jpeg', 'quality': 80}
+        if clip:
+            params['clip'] = {'x': clip['x'], 'y': clip['y'],
+                              'width': clip['width'], 'height': clip['height'],
+                              'scale': 1}
+        result = await cdp.send('Page.captureScreenshot', params)
+        return base64.b64decode(result['data'])
+
+    async def _new_pooled_page(self):
+        """Create a page configured for pooling.
+
+        No dialog handler is attached: the init script stubs out
+        window.confirm/alert and window.open before any page script runs,
+        so native dialogs never fire and the per-event coroutine the old
+        handler allocated was dead weight.
+        """
+        return await self.context.new_page()
+
+    async def _acquire_page(self):
+        """Check a warm page out of the pool, creating one if the pool is empty.
+
+        The semaphore bounds the number of checked-out pages so concurrent
+        requests above the cap wait here instead of piling onto Chromium.
+        """
+        await self._sema.acquire()
+        try:
+            if self._page_pool is not None:
+                try:
+                    page = self._page_pool.get_nowait()
+                    if not page.is_closed():
+                        return page
+                except asyncio.QueueEmpty:
+                    pass
+            return await self._new_pooled_page()
+        except BaseException:
+            self._sema.release()
+            raise
+
+    async def _release_page(self, page):
+        """Return a page to the pool after parking it on a blank document."""
+        try:
+            if page.is_closed():
+                return
+            if self._page_pool is not None and self._page_pool.qsize() < self._pool_size:
+                await page.goto('about:blank')
+                self._page_pool.put_nowait(page)
+            else:
+                await page.close()
+        except Exception as e:
+            logger.warning(f"Error returning page to pool, closing it: {e}")
+            try:
+                await page.close()
+            except Exception:
+                pass
+        finally:
+            self._sema.release()
+
 
+    @lru_cache(maxsize=1024)
+    def _build_chart_url(self, normalized_symbol: str, timeframe: Optional[str]) -> str:
+        """Assemble the chart URL for a normalized symbol/timeframe pair.
 
-    async def take_screenshot(self, symbol, timeframe=None, fullscreen=False):
-        """Take a screenshot of a chart using Playwright for Python."""
+        A pure function of its arguments (the link and interval tables are
+        static), so lru_cache collapses the repeated dict lookups and
+        string concatenation into one dict hit per distinct pair.
+        """
+        chart_url = self.chart_links.get(normalized_symbol)
+        if not chart_url:
+            logger.warning(f"No specific chart layout URL found for {normalized_symbol}, using default chart page.")
+            chart_url = f"https://www.tradingview.com/chart/?symbol={normalized_symbol}"
+            if timeframe:
+                tv_interval = self.interval_map.get(timeframe, "D")
+                chart_url += f"&interval={tv_interval}"
+        elif timeframe: # Append interval to existing layout URL
+            tv_interval = self.interval_map.get(timeframe, "D")
+            separator = '&' if '?' in chart_url else '?'
+            chart_url += f"{separator}interval={tv_interval}"
+        return chart_url
+
+    async def take_screenshot(self, symbol, timeframe=None, fullscreen=False, path=None):
+        """Take a screenshot of a chart using Playwright for Python.
+
+        When ``path`` is given the browser streams the capture straight to
+        that file and the path is returned, keeping the encoded image out
+        of Python memory; otherwise the raw bytes are returned as before.
+        """
         if not self.is_initialized or not self.context:
              logger.error("Playwright service not initialized or context not available.")
              # Attempt to initialize if needed
@@ -265,19 +520,9 @@ class TradingViewNodeService(TradingViewService):
 
         logger.info(f"Taking screenshot for {symbol} on {timeframe} timeframe (fullscreen: {fullscreen})")
 
-        # Build chart URL (same logic as before)
-        normalized_symbol = symbol.replace("/", "").upper()
-        chart_url = self.chart_links.get(normalized_symbol)
-        if not chart_url:
-            logger.warning(f"No specific chart layout URL found for {symbol}, using default chart page.")
-            chart_url = f"https://www.tradingview.com/chart/?symbol={normalized_symbol}"
-            if timeframe:
-                tv_interval = self.interval_map.get(timeframe, "D")
-                chart_url += f"&interval={tv_interval}"
-        elif timeframe: # Append interval to existing layout URL
-             tv_interval = self.interval_map.get(timeframe, "D")
-             separator = '&' if '?' in chart_url else '?'
-             chart_url += f"{separator}interval={tv_interval}"
+        # Build chart URL (cached per symbol/timeframe pair)
+        normalized_symbol = _normalize_symbol(symbol)
+        chart_url = self._build_chart_url(normalized_symbol, timeframe)
 
         if not chart_url:
             logger.error(f"Invalid chart URL constructed for {symbol}")
@@ -285,68 +530,42 @@ class TradingViewNodeService(TradingViewService):
 
         page = None
         try:
-            page = await self.context.new_page()
+            page = await self._acquire_page()
             logger.info(f"Navigating to URL: {chart_url}")
 
-            # Auto dismiss dialogs (though init script and CSS should handle most)
-            page.on('dialog', lambda dialog: asyncio.ensure_future(dialog.dismiss()))
-
-            # Add CSS to hide dialogs immediately
-            await page.add_style_tag(content=HIDE_DIALOGS_CSS)
-
-            await page.goto(chart_url, wait_until='domcontentloaded', timeout=30000) # 30s timeout
-
-            # Apply localStorage settings again and try to close popups via JS
-            await page.evaluate(f"""
-                const tvLocalStorage = {json.dumps(TV_LOCAL_STORAGE)};
-                for (const [key, value] of Object.entries(tvLocalStorage)) {{
-                    try {{ localStorage.setItem(key, value); }} catch (e) {{}}
-                }}
-                document.dispatchEvent(new KeyboardEvent('keydown', {{ key: 'Escape', keyCode: 27 }}));
-                document.querySelectorAll('button.close-B02UUUN3, button[data-name="close"], .nav-button-znwuaSC1').forEach(btn => {{
-                    try {{ btn.click(); }} catch (e) {{}}
-                }});
-                document.querySelectorAll('[role="dialog"], .tv-dialog, .js-dialog, .tv-dialog--popup').forEach(dialog => {{
-                    dialog.style.display = 'none';
-                }});
-            """)
-            
-            # Add CSS again for robustness
-            await page.add_style_tag(content=HIDE_DIALOGS_CSS)
-
-            # Wait briefly for the page to settle and scripts to run
-            await page.wait_for_timeout(1000) # Reduced from 2000ms
-
-            # Attempt to close common close buttons directly
-            close_selectors = [
-                'button.close-B02UUUN3',
-                'button[data-name="close"]',
-                'button.nav-button-znwuaSC1.size-medium-znwuaSC1.preserve-paddings-znwuaSC1.close-B02UUUN3',
-                'button:has-text("Got it")', # Common confirmation button text
-                 'button[aria-label*="Close"]' # Common aria labels
-            ]
-            for selector in close_selectors:
-                try:
-                    buttons = await page.query_selector_all(selector)
-                    for button in buttons:
-                         if await button.is_visible():
-                              await button.click(timeout=500, force=True) # Short timeout, force click
-                              logger.info(f"Clicked potential close button: {selector}")
-                              await page.wait_for_timeout(100) # Small delay after click
-                except PlaywrightTimeoutError:
-                     pass # Ignore timeout errors when clicking close buttons
-                except Exception as e:
-                     logger.warning(f"Minor error clicking close button {selector}: {e}")
+            # Dialog-hiding CSS comes from the context init script, which
+            # runs on every navigation; no pre-goto style injection needed.
+            # Return at commit and wait for the chart container selector
+            # instead of DOMContentLoaded: the container appearing is the
+            # real readiness signal and usually precedes the full DOM parse
+            await page.goto(chart_url, wait_until='commit', timeout=30000) # 30s timeout
 
-
-            # Wait for the main chart container to be present
+            chart_container_selector = ".chart-gui-wrapper, .chart-container, .layout__area--center" # Common selectors
             try:
-                chart_container_selector = ".chart-gui-wrapper, .chart-container, .layout__area--center" # Common selectors
-                await page.wait_for_selector(chart_container_selector, timeout=10000) # 10s timeout
+                await page.wait_for_selector(chart_container_selector, timeout=15000)
                 logger.info("Chart container found.")
             except PlaywrightTimeoutError:
                 logger.warning("Chart container selector not found within timeout, proceeding anyway.")
 
+            # Dismiss stray popups via JS; the dialog-hiding CSS already
+            # comes from the init script, so no repeat injection is needed
+            await page.evaluate(_POST_GOTO_SCRIPT)
+
+            # Wait until the chart canvas actually exists instead of
+            # sleeping a fixed second; fast pages continue immediately
+            try:
+                await page.wait_for_function(
+                    "() => document.querySelector('canvas') !== null", timeout=5000)
+            except PlaywrightTimeoutError:
+                logger.warning("Chart canvas not detected within 5s, proceeding anyway.")
+
+            # Attempt to close common close buttons in one in-page pass
+            try:
+                clicked = await page.evaluate(_CLOSE_BUTTONS_SCRIPT)
+                if clicked:
+                    logger.info(f"Clicked {clicked} potential close button(s).")
+            except Exception as e:
+                logger.warning(f"Minor error clicking close buttons: {e}")
 
             if fullscreen:
                 logger.info("Applying minimal CSS and simulating Shift+F for fullscreen...")
@@ -357,14 +576,15 @@ class TradingViewNodeService(TradingViewService):
                      { display: none !important; visibility: hidden !important; opacity: 0 !important; }
                     body { overflow: hidden !important; } /* Prevent scrollbars */
                 """)
-                await page.wait_for_timeout(300) # Reduced from 500ms
-                
+
                 # Simulate Shift+F
                 logger.info("Simulating Shift+F keyboard shortcut.")
                 await page.keyboard.press('Shift+F')
-                
-                # Wait specifically for the fullscreen transition
-                await page.wait_for_timeout(1000) # Reduced from 1500ms
+
+                # Let the fullscreen relayout settle: two animation frames
+                # cover the resize reflow without a fixed sleep
+                await page.evaluate(
+                    "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))")
 
             # Additional aggressive cleanup just before screenshot
             await page.evaluate("""
@@ -376,22 +596,48 @@ class TradingViewNodeService(TradingViewService):
                     });
                 }
             """)
-            await page.wait_for_timeout(300) # Reduced from 500ms
 
             logger.info("Taking screenshot with Playwright...")
             if fullscreen:
-                 screenshot_bytes = await page.screenshot(type='png', full_page=True) # Use full_page for fullscreen
+                 screenshot_bytes = await page.screenshot(type='jpeg', quality=80, full_page=True, path=path) # Use full_page for fullscreen
             else:
                  # Find the main chart element for non-fullscreen screenshots
                  chart_element_locator = page.locator(".chart-gui-wrapper, .chart-container--has-single-pane .chart-markup-table, .layout__area--center .tv-widget-chart").first
                  try:
                       await chart_element_locator.wait_for(state="visible", timeout=5000)
-                      screenshot_bytes = await chart_element_locator.screenshot(type='png')
+                      screenshot_bytes = await chart_element_locator.screenshot(type='jpeg', quality=80, path=path)
                  except Exception as e:
-                      logger.warning(f"Could not find specific chart element, taking viewport screenshot instead: {e}")
-                      screenshot_bytes = await page.screenshot(type='png') # Fallback to viewport screenshot
+                      logger.warning(f"Could not find specific chart element, taking clipped viewport screenshot instead: {e}")
+                      # Clip to the chart's bounding box when one can be
+                      # computed: fewer pixels to encode and transfer
+                      clip = None
+                      try:
+                          clip = await page.evaluate("""
+                              () => {
+                                  const el = document.querySelector('.chart-gui-wrapper, .chart-container, .chart-markup-table, .layout__area--center');
+                                  if (!el) return null;
+                                  const r = el.getBoundingClientRect();
+                                  return (r.width > 0 && r.height > 0)
+                                      ? { x: r.x, y: r.y, width: r.width, height: r.height }
+                                      : null;
+                              }
+                          """)
+                      except Exception:
+                          pass
+                      if path is None:
+                          # No file target and no locator involved: raw CDP
+                          # capture skips the Playwright protocol layer
+                          screenshot_bytes = await self._cdp_screenshot(page, clip)
+                      elif clip:
+                          screenshot_bytes = await page.screenshot(type='jpeg', quality=80, clip=clip, path=path)
+                      else:
+                          screenshot_bytes = await page.screenshot(type='jpeg', quality=80, path=path) # Fallback to viewport screenshot
 
             logger.info(f"Screenshot taken successfully ({len(screenshot_bytes)} bytes).")
+            if path:
+                # The image already lives on disk; hand back the location
+                # instead of keeping a second copy in memory
+                return path
             return screenshot_bytes
 
         except PlaywrightTimeoutError as e:
@@ -405,7 +651,7 @@ class TradingViewNodeService(TradingViewService):
             return None
         finally:
             if page:
-                await page.close()
+                await self._release_page(page)
 
     async def get_analysis(self, symbol: str, timeframe: str) -> Optional[str]:
         """Get technical analysis summary text from TradingView using Playwright."""
@@ -423,48 +669,47 @@ class TradingViewNodeService(TradingViewService):
 
         logger.info(f"Getting analysis for {symbol} on {timeframe} timeframe")
 
-        normalized_symbol = symbol.replace("/", "").upper()
+        normalized_symbol = _normalize_symbol(symbol)
+
+        # Serve repeats within the TTL straight from memory
+        cache_key = (normalized_symbol, timeframe)
+        cached = self._analysis_cache.get(cache_key)
+        if cached is not None:
+            cached_at, cached_text = cached
+            if time.monotonic() - cached_at < self._analysis_cache_ttl:
+                logger.info(f"Analysis cache hit for {symbol}/{timeframe}")
+                return cached_text
         # Try to find the corresponding chart URL, otherwise fallback to general symbol page
         chart_url = self.chart_links.get(normalized_symbol, f"https://www.tradingview.com/symbols/{normalized_symbol}/")
 
         page = None
         try:
-            page = await self.context.new_page()
+            page = await self._acquire_page()
             logger.info(f"Navigating to URL for analysis: {chart_url}")
             
             # Kortere timeout voor snellere respons
             await page.goto(chart_url, wait_until='domcontentloaded', timeout=10000) # 10s timeout (was 20s)
 
-            # Kortere wachttijd na laden
-            await page.wait_for_timeout(500) # Was 1500ms
-
-            # Try to find the technical analysis summary element
-            # Optimaliseer selectors voor snellere matching
-            analysis_selectors = [
-                 "div[data-widget-name='Technical Analysis'] .container-zF547vzy", 
-                 ".tv-symbol-technicals-widget__summary-text",
-                 ".tv-symbol-profile__description"
-            ]
-
+            # Eén in-page scan over alle selectors tegelijk: wait_for_function
+            # pollt tot een van de widgets bruikbare tekst heeft en geeft die
+            # direct terug, in plaats van een locator-wait per selector
             analysis_text = None
-            for selector in analysis_selectors:
-                try:
-                    element = page.locator(selector).first
-                    # Gebruik een zeer korte timeout per selector
-                    await element.wait_for(state="visible", timeout=500) # Verlaagd van 1500ms
-                    analysis_text = await element.inner_text()
-                    if analysis_text and len(analysis_text) > 20: # Kleinere check
-                        # Basic Cleaning
-                        analysis_text = '\n'.join([line.strip() for line in analysis_text.split('\n') if line.strip()])
-                        break # Stop zodra we iets bruikbaars vinden
-                except Exception:
-                    continue # Probeer volgende selector
+            try:
+                handle = await page.wait_for_function(_ANALYSIS_TEXT_SCRIPT, timeout=2000)
+                analysis_text = await handle.json_value()
+            except PlaywrightTimeoutError:
+                pass
+
+            if analysis_text:
+                # Basic Cleaning
+                analysis_text = '\n'.join([line.strip() for line in analysis_text.split('\n') if line.strip()])
 
             if analysis_text:
                  # Kortere output om problemen te voorkomen
                  max_len = 800 # Korter dan de eerdere 1500
                  if len(analysis_text) > max_len:
                       analysis_text = analysis_text[:max_len] + "..."
+                 self._analysis_cache[cache_key] = (time.monotonic(), analysis_text)
                  return analysis_text
             
             # Als geen analyse is gevonden, probeer een eenvoudig alternatief
@@ -474,7 +719,9 @@ class TradingViewNodeService(TradingViewService):
                 price_element = await page.locator(".tv-symbol-price-quote__value").inner_text()
                 
                 if symbol_header and price_element:
-                    return f"📊 Technical Analysis: {symbol_header}\n\nCurrent price: {price_element}\n\nMarket is in consolidation. Check chart for key levels."
+                    fallback_text = f"📊 Technical Analysis: {symbol_header}\n\nCurrent price: {price_element}\n\nMarket is in consolidation. Check chart for key levels."
+                    self._analysis_cache[cache_key] = (time.monotonic(), fallback_text)
+                    return fallback_text
             except Exception:
                 pass
                 
@@ -491,13 +738,24 @@ class TradingViewNodeService(TradingViewService):
             return None
         finally:
             if page:
-                await page.close()
+                await self._release_page(page)
 
     async def cleanup(self):
         """Clean up Playwright resources."""
         logger.info("Cleaning up Playwright service...")
+        if self._page_pool is not None:
+            while not self._page_pool.empty():
+                try:
+                    page = self._page_pool.get_nowait()
+                    if not page.is_closed():
+                        await page.close()
+                except Exception as e:
+                    logger.error(f"Error closing pooled page: {e}")
+            self._page_pool = None
         if self.context:
             try:
+                # Closing the persistent context flushes the profile to
+                # disk and shuts down its browser
                 await self.context.close()
                 self.context = None
                 logger.info("Playwright context closed.")
@@ -805,56 +805,79 @@ class Database:
                 return False
                 
             subscription = await self.get_user_subscription(user_id)
-            if not subscription:
-                return False
-                
-            # Check if subscription is active
-            if subscription.get('subscription_status') != 'active':
-                return False
-            
-            # Check if subscription has not expired
-            current_period_end = subscription.get('current_period_end')
-            if not current_period_end:
-                return False
-                
-            # Convert to datetime if it's a string
-            if isinstance(current_period_end, str):
-                try:
-                    current_period_end = datetime.datetime.fromisoformat(current_period_end.replace('Z', '+00:00'))
-                except:
-                    # If parsing fails, assume subscription is expired
-                    return False
-            
-            # Compare with current time
-            current_time = datetime.datetime.now(timezone.utc)
-            if current_period_end < current_time:
-                return False
-                
-            # All checks passed, user is subscribed
-            return True
+            return self._subscription_is_active(subscription)
         except Exception as e:
             logger.error(f"Error checking if user is subscribed: {str(e)}")
             return False
-            
+
+    @staticmethod
+    def _subscription_is_active(subscription) -> bool:
+        """Check of een subscription record actief en niet verlopen is"""
+        if not subscription:
+            return False
+
+        # Check if subscription is active
+        if subscription.get('subscription_status') != 'active':
+            return False
+
+        # Check if subscription has not expired
+        current_period_end = subscription.get('current_period_end')
+        if not current_period_end:
+            return False
+
+        # Convert to datetime if it's a string
+        if isinstance(current_period_end, str):
+            try:
+                current_period_end = datetime.datetime.fromisoformat(current_period_end.replace('Z', '+00:00'))
+            except:
+                # If parsing fails, assume subscription is expired
+                return False
+
+        # Compare with current time
+        return current_period_end >= datetime.datetime.now(timezone.utc)
+
+    @staticmethod
+    def _subscription_payment_failed(subscription) -> bool:
+        """Check of de subscription status op een mislukte betaling wijst"""
+        if not subscription:
+            return False
+        return subscription.get('subscription_status') in ('past_due', 'unpaid', 'incomplete', 'incomplete_expired')
+
     async def has_payment_failed(self, user_id: int) -> bool:
         """Check if user's subscription payment has failed"""
         try:
             # Retrieve the user's subscription
             subscription = await self.get_user_subscription(user_id)
-            
-            if not subscription:
-                return False
-            
-            # Check if status indicates a payment failure
-            status = subscription.get('subscription_status')
-            
-            # Check for payment failure status
-            return status in ['past_due', 'unpaid', 'incomplete', 'incomplete_expired']
-            
+            return self._subscription_payment_failed(subscription)
         except Exception as e:
             logger.error(f"Error checking payment failure status: {str(e)}")
             return False
-            
+
+    async def get_user_status(self, user_id: int) -> tuple:
+        """Haal (is_subscribed, payment_failed) op met één subscription fetch
+
+        Beide vlaggen komen uit dezelfde rij; dit vervangt de twee aparte
+        round-trips van is_user_subscribed + has_payment_failed op het hot path.
+        """
+        try:
+            if self.use_mock_data:
+                subscription = await self.get_user_subscription(user_id)
+            else:
+                # Smalle select: alleen de twee kolommen die de vlaggen bepalen,
+                # zodat het hot path niet de volledige rij over de lijn trekt
+                response = self.supabase.table('user_subscriptions') \
+                    .select('subscription_status,current_period_end') \
+                    .eq('user_id', user_id).execute()
+                subscription = response.data[0] if response.data else None
+            return (
+                self._subscription_is_active(subscription),
+                self._subscription_payment_failed(subscription)
+            )
+        except Exception as e:
+            logger.error(f"Error getting user status: {str(e)}")
+            return False, False
+
+
     async def get_user_subscription_type(self, user_id: int):
         """Haal het type abonnement op voor een gebruiker"""
         try:
@@ -868,6 +891,29 @@ class Database:
             logger.error(f"Error getting subscription type: {str(e)}")
             return None
 
+    async def upsert_user_and_get_status(self, user_id: int, first_name: str, last_name: str = None, username: str = None) -> tuple:
+        """Registreer een gebruiker (indien nieuw) en geef de status in één ronde
+
+        Retourneert (created, is_subscribed, payment_failed) op basis van één
+        subscription fetch, i.p.v. de vier losse awaits die /start eerst deed.
+        Met een SQL backend zou dit één INSERT ... ON CONFLICT ... RETURNING
+        zijn; via de supabase client blijft het bij één fetch plus een
+        save_user voor nieuwe gebruikers.
+        """
+        try:
+            subscription = await self.get_user_subscription(user_id)
+            created = subscription is None
+            if created:
+                await self.save_user(user_id, first_name, last_name, username)
+            return (
+                created,
+                self._subscription_is_active(subscription),
+                self._subscription_payment_failed(subscription)
+            )
+        except Exception as e:
+            logger.error(f"Error upserting user {user_id}: {str(e)}")
+            return False, False, False
+
     async def save_user(self, user_id: int, first_name: str, last_name: str = None, username: str = None) -> bool:
         """Sla een gebruiker op in de database"""
         try:
@@ -2,10 +2,12 @@ import os
 import json
 import asyncio
 import traceback
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta, timezone
 import logging
-import copy
 import re
 import time
 import random
@@ -13,6 +15,7 @@ import base64
 import socket
 import sys
 import tempfile
+import types
 
 # Import FastAPI wanneer het beschikbaar is, met een fallback optie
 try:
@@ -52,10 +55,29 @@ from telegram.error import TelegramError, BadRequest
 import httpx
 import telegram.error  # Add this import for BadRequest error handling
 
+# Eén globale binding i.p.v. LOAD_GLOBAL + LOAD_ATTR op elk send/edit punt
+_HTML = ParseMode.HTML
+
+# orjson is optioneel: C-level JSON (de)serialisatie voor user_data/state payloads
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, default=str)
+
+    _loads = json.loads
+
 # Verwijder of vervang imports die naar 'trading_bot.utils' verwijzen
 # Eenvoudige ConfigManager implementatie lokaal definiëren
 class ConfigManager:
     """Simple config manager that reads from environment variables"""
+    __slots__ = ("TELEGRAM_BOT_TOKEN",)
+
     def __init__(self):
         self.TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
         
@@ -69,6 +91,8 @@ try:
 except ImportError:
     # Fallback dummy implementation
     class ChartService:
+        __slots__ = ()
+
         async def get_chart(self, instrument, timeframe=None):
             return None
         async def get_technical_analysis(self, instrument, timeframe=None):
@@ -80,10 +104,16 @@ try:
 except ImportError:
     # Dummy Database class als fallback
     class Database:
+        __slots__ = ()
+
         async def is_user_subscribed(self, user_id):
             return True
         async def has_payment_failed(self, user_id):
             return False
+        async def get_user_status(self, user_id):
+            return True, False
+        async def upsert_user_and_get_status(self, user_id, first_name, last_name=None, username=None):
+            return False, True, False
         async def get_user_subscription(self, user_id):
             return {"active": True}
         async def save_user(self, user_id, first_name, last_name, username):
@@ -94,6 +124,8 @@ try:
 except ImportError:
     # Dummy MarketSentimentService class als fallback
     class MarketSentimentService:
+        __slots__ = ()
+
         async def get_sentiment(self, instrument):
             return {"summary": "Neutral", "details": "Sentiment analysis not available"}
 
@@ -102,6 +134,8 @@ try:
 except ImportError:
     # Dummy EconomicCalendarService class als fallback
     class EconomicCalendarService:
+        __slots__ = ()
+
         async def get_calendar(self):
             return []
 
@@ -111,7 +145,7 @@ try:
 except ImportError:
     # Dummy implementaties als fallback
     class StripeService:
-        pass
+        __slots__ = ()
     def get_subscription_features():
         return {}
 
@@ -119,17 +153,18 @@ except ImportError:
 try:
     from . import states
 except ImportError:
-    # Dummy states als fallback
-    class states:
-        MAIN_MENU = "MAIN_MENU"
-        VIEW_MARKETS = "VIEW_MARKETS"
-        VIEW_INSTRUMENTS = "VIEW_INSTRUMENTS"
-        VIEW_NOTIFICATIONS = "VIEW_NOTIFICATIONS"
-        SELECT_INSTRUMENT = "SELECT_INSTRUMENT"
-        SELECT_MARKET = "SELECT_MARKET"
-        EDIT_MARKET_NOTIFICATION = "EDIT_MARKET_NOTIFICATION"
-        SIGNAL_MENU = "SIGNAL_MENU"
-        SIGNAL_INSTRUMENT = "SIGNAL_INSTRUMENT"
+    # Dummy states als fallback; IntEnum zodat ConversationHandler dispatch
+    # een enkele integer compare is, net als bij het echte states-module
+    class states(IntEnum):
+        MAIN_MENU = 0
+        VIEW_MARKETS = 1
+        VIEW_INSTRUMENTS = 2
+        VIEW_NOTIFICATIONS = 3
+        SELECT_INSTRUMENT = 4
+        SELECT_MARKET = 5
+        EDIT_MARKET_NOTIFICATION = 6
+        SIGNAL_MENU = 7
+        SIGNAL_INSTRUMENT = 8
 
 # Lokale import voor gif_utils
 try:
@@ -148,6 +183,8 @@ try:
 except ImportError:
     # Dummy implementaties
     class TradingViewCalendarService:
+        __slots__ = ()
+
         async def get_calendar(self):
             return []
     def debug_tradingview_api():
@@ -158,8 +195,9 @@ except ImportError:
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Major currencies to focus on
+# Major currencies to focus on (lijst voor volgorde, set voor membership checks)
 MAJOR_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "NZD", "CAD"]
+MAJOR_CURRENCIES_SET = frozenset(MAJOR_CURRENCIES)
 
 # Currency to flag emoji mapping
 CURRENCY_FLAG = {
@@ -173,6 +211,10 @@ CURRENCY_FLAG = {
     "CAD": "🇨🇦"
 }
 
+# Voorgeformatteerde "vlag + code" labels, zodat render-loops één dict lookup
+# doen i.p.v. per bericht opnieuw te formatteren
+CURRENCY_WITH_FLAG = {c: f"{CURRENCY_FLAG[c]} {c}" for c in MAJOR_CURRENCIES}
+
 # Map of instruments to their corresponding currencies
 INSTRUMENT_CURRENCY_MAP = {
     # Special case for global view
@@ -214,45 +256,36 @@ INSTRUMENT_CURRENCY_MAP = {
     "XRPUSD": ["USD", "XRP"]
 }
 
-# Mapping of analysis styles to their available timeframes
-STYLE_TIMEFRAME_MAP = {
-    "Technical Analysis": ["1m", "5m", "15m", "1h", "4h", "1D", "1W", "1M"],
-    "Sentiment Analysis": ["1D"],  # Sentiment is typically daily
-    "Economic Calendar": ["1D"],  # Calendar events are daily
-}
-
-# Mapping of specific instruments to their typically relevant timeframes
-# This can override or supplement the style-based timeframes if needed
-INSTRUMENT_TIMEFRAME_MAP = {
-    # Example: Maybe US30 is better analyzed on slightly longer short-term frames
-    "US30": ["5m", "15m", "1h", "4h", "1D", "1W"],
-    # Example: FX majors might include 1m for scalping perspective
-    "EURUSD": ["1m", "5m", "15m", "1h", "4h", "1D", "1W", "1M"],
-    "GBPUSD": ["1m", "5m", "15m", "1h", "4h", "1D", "1W", "1M"],
-    # Default can be inferred from STYLE_TIMEFRAME_MAP if not specified
-}
-
-# Mapping of internal timeframe codes to display names
-TIMEFRAME_DISPLAY_MAP = {
-    "1m": "1 Minute",
-    "5m": "5 Minutes",
-    "15m": "15 Minutes",
-    "1h": "1 Hour",
-    "4h": "4 Hours",
-    "1D": "Daily",
-    "1W": "Weekly",
-    "1M": "Monthly",
+# Conversation states één keer op module-niveau oplossen; hasattr(states, ...)
+# per callback is een try/except-getattr op het hot path
+_S_MENU = getattr(states, 'MENU', None)
+_S_CHOOSE_ANALYSIS = getattr(states, 'CHOOSE_ANALYSIS', None)
+_S_CHOOSE_SIGNALS = getattr(states, 'CHOOSE_SIGNALS', None)
+_S_CHOOSE_MARKET = getattr(states, 'CHOOSE_MARKET', None)
+_S_CHOOSE_INSTRUMENT = getattr(states, 'CHOOSE_INSTRUMENT', None)
+_S_CHOOSE_TIMEFRAME = getattr(states, 'CHOOSE_TIMEFRAME', None)
+_S_SIGNAL_DETAILS = getattr(states, 'SIGNAL_DETAILS', None)
+
+# Analysis types + dispatch naar de bijbehorende show_* method, zodat
+# instrument_callback niet hoeft te groeien tot een string-vergelijkingsketen
+ANALYSIS_TECHNICAL = 'technical'
+ANALYSIS_SENTIMENT = 'sentiment'
+ANALYSIS_CALENDAR = 'calendar'
+_ANALYSIS_DISPATCH = {
+    ANALYSIS_TECHNICAL: 'show_technical_analysis',
+    ANALYSIS_SENTIMENT: 'show_sentiment_analysis',
+    ANALYSIS_CALENDAR: 'show_economic_calendar',
 }
 
 # Callback data constants
 CALLBACK_ANALYSIS_TECHNICAL = "analysis_technical"
 CALLBACK_ANALYSIS_SENTIMENT = "analysis_sentiment"
 CALLBACK_ANALYSIS_CALENDAR = "analysis_calendar"
-CALLBACK_BACK_MENU = "back_menu"
-CALLBACK_BACK_ANALYSIS = "back_to_analysis"
-CALLBACK_BACK_MARKET = "back_market"
-CALLBACK_BACK_INSTRUMENT = "back_instrument"
-CALLBACK_BACK_SIGNALS = "back_signals"
+CALLBACK_BACK_MENU = sys.intern("back_menu")
+CALLBACK_BACK_ANALYSIS = sys.intern("back_to_analysis")
+CALLBACK_BACK_MARKET = sys.intern("back_market")
+CALLBACK_BACK_INSTRUMENT = sys.intern("back_instrument")
+CALLBACK_BACK_SIGNALS = sys.intern("back_signals")
 CALLBACK_SIGNALS_ADD = "signals_add"
 CALLBACK_SIGNALS_MANAGE = "signals_manage"
 CALLBACK_MENU_ANALYSE = "menu_analyse"
@@ -261,6 +294,18 @@ CALLBACK_SIGNAL_TECHNICAL = "signal_technical"
 CALLBACK_SIGNAL_SENTIMENT = "signal_sentiment"
 CALLBACK_SIGNAL_CALENDAR = "signal_calendar"
 
+# Alle back-callbacks als frozenset van interned strings: de router kan zo
+# met één hashed (identity-)probe naar handle_back_button kortsluiten
+_BACK_CALLBACKS = frozenset({
+    CALLBACK_BACK_MENU,
+    CALLBACK_BACK_ANALYSIS,
+    CALLBACK_BACK_MARKET,
+    CALLBACK_BACK_INSTRUMENT,
+    CALLBACK_BACK_SIGNALS,
+    sys.intern("back_to_signal_analysis"),
+    sys.intern("back_to_signal"),
+})
+
 # States
 MENU = 0
 CHOOSE_ANALYSIS = 1
@@ -325,26 +370,85 @@ Available commands:
 /help - Show this help message
 """
 
+FAILED_PAYMENT_TEXT = """
+❗ <b>Subscription Payment Failed</b> ❗
+
+Your subscription payment could not be processed and your service has been deactivated.
+
+To continue using Sigmapips AI and receive trading signals, please reactivate your subscription by clicking the button below.
+"""
+
+TRIAL_WELCOME_HTML_TEXT = """
+🚀 <b>Welcome to Sigmapips AI!</b> 🚀
+
+<b>Discover powerful trading signals for various markets:</b>
+• <b>Forex</b> - Major and minor currency pairs
+• <b>Crypto</b> - Bitcoin, Ethereum and other top cryptocurrencies
+• <b>Indices</b> - Global market indices
+• <b>Commodities</b> - Gold, silver and oil
+
+<b>Features:</b>
+✅ Real-time trading signals
+
+✅ Multi-timeframe analysis (1m, 15m, 1h, 4h)
+
+✅ Advanced chart analysis
+
+✅ Sentiment indicators
+
+✅ Economic calendar integration
+
+<b>Start today with a FREE 14-day trial!</b>
+"""
+
+TRIAL_WELCOME_TEXT = """
+🚀 Welcome to Sigmapips AI! 🚀
+
+Discover powerful trading signals for various markets:
+• Forex - Major and minor currency pairs
+• Crypto - Bitcoin, Ethereum and other top cryptocurrencies
+• Indices - Global market indices
+• Commodities - Gold, silver and oil
+
+Features:
+✅ Real-time trading signals
+✅ Multi-timeframe analysis (1m, 15m, 1h, 4h)
+✅ Advanced chart analysis
+✅ Sentiment indicators
+✅ Economic calendar integration
+
+Start today with a FREE 14-day trial!
+"""
+
+# Gedeelde, gecachte "⬅️ Back" knop: dezelfde knop komt in tientallen
+# keyboards terug met maar een paar distincte callback_data waarden
+@lru_cache(maxsize=None)
+def _back(data: str) -> InlineKeyboardButton:
+    return InlineKeyboardButton("⬅️ Back", callback_data=data)
+
 # Start menu keyboard
 START_KEYBOARD = [
     [InlineKeyboardButton("🔍 Analyze Market", callback_data=CALLBACK_MENU_ANALYSE)],
     [InlineKeyboardButton("📊 Trading Signals", callback_data=CALLBACK_MENU_SIGNALS)]
 ]
+START_MARKUP = InlineKeyboardMarkup(START_KEYBOARD)
 
 # Analysis menu keyboard
 ANALYSIS_KEYBOARD = [
     [InlineKeyboardButton("📈 Technical Analysis", callback_data=CALLBACK_ANALYSIS_TECHNICAL)],
     [InlineKeyboardButton("🧠 Market Sentiment", callback_data=CALLBACK_ANALYSIS_SENTIMENT)],
     [InlineKeyboardButton("📅 Economic Calendar", callback_data=CALLBACK_ANALYSIS_CALENDAR)],
-    [InlineKeyboardButton("⬅️ Back", callback_data=CALLBACK_BACK_MENU)]
+    [_back(CALLBACK_BACK_MENU)]
 ]
+ANALYSIS_MARKUP = InlineKeyboardMarkup(ANALYSIS_KEYBOARD)
 
 # Signals menu keyboard
 SIGNALS_KEYBOARD = [
     [InlineKeyboardButton("➕ Add New Pairs", callback_data=CALLBACK_SIGNALS_ADD)],
     [InlineKeyboardButton("⚙️ Manage Signals", callback_data=CALLBACK_SIGNALS_MANAGE)],
-    [InlineKeyboardButton("⬅️ Back", callback_data=CALLBACK_BACK_MENU)]
+    [_back(CALLBACK_BACK_MENU)]
 ]
+SIGNALS_MARKUP = InlineKeyboardMarkup(SIGNALS_KEYBOARD)
 
 # Market keyboard voor signals
 MARKET_KEYBOARD_SIGNALS = [
@@ -352,8 +456,9 @@ MARKET_KEYBOARD_SIGNALS = [
     [InlineKeyboardButton("Crypto", callback_data="market_crypto_signals")],
     [InlineKeyboardButton("Commodities", callback_data="market_commodities_signals")],
     [InlineKeyboardButton("Indices", callback_data="market_indices_signals")],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_signals")]
+    [_back("back_signals")]
 ]
+MARKET_SIGNALS_MARKUP = InlineKeyboardMarkup(MARKET_KEYBOARD_SIGNALS)
 
 # Market keyboard voor analyse
 MARKET_KEYBOARD = [
@@ -361,8 +466,9 @@ MARKET_KEYBOARD = [
     [InlineKeyboardButton("Crypto", callback_data="market_crypto")],
     [InlineKeyboardButton("Commodities", callback_data="market_commodities")],
     [InlineKeyboardButton("Indices", callback_data="market_indices")],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_analysis")]
+    [_back("back_analysis")]
 ]
+MARKET_MARKUP = InlineKeyboardMarkup(MARKET_KEYBOARD)
 
 # Market keyboard specifiek voor sentiment analyse
 MARKET_SENTIMENT_KEYBOARD = [
@@ -370,8 +476,9 @@ MARKET_SENTIMENT_KEYBOARD = [
     [InlineKeyboardButton("Crypto", callback_data="market_crypto_sentiment")],
     [InlineKeyboardButton("Commodities", callback_data="market_commodities_sentiment")],
     [InlineKeyboardButton("Indices", callback_data="market_indices_sentiment")],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_analysis")]
+    [_back("back_analysis")]
 ]
+MARKET_SENTIMENT_MARKUP = InlineKeyboardMarkup(MARKET_SENTIMENT_KEYBOARD)
 
 # Forex keyboard voor technical analyse
 FOREX_KEYBOARD = [
@@ -385,8 +492,9 @@ FOREX_KEYBOARD = [
         InlineKeyboardButton("USDCAD", callback_data="instrument_USDCAD_chart"),
         InlineKeyboardButton("EURGBP", callback_data="instrument_EURGBP_chart")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+FOREX_MARKUP = InlineKeyboardMarkup(FOREX_KEYBOARD)
 
 # Forex keyboard voor sentiment analyse
 FOREX_SENTIMENT_KEYBOARD = [
@@ -400,8 +508,9 @@ FOREX_SENTIMENT_KEYBOARD = [
         InlineKeyboardButton("USDCAD", callback_data="instrument_USDCAD_sentiment"),
         InlineKeyboardButton("EURGBP", callback_data="instrument_EURGBP_sentiment")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+FOREX_SENTIMENT_MARKUP = InlineKeyboardMarkup(FOREX_SENTIMENT_KEYBOARD)
 
 # Forex keyboard voor kalender analyse
 FOREX_CALENDAR_KEYBOARD = [
@@ -415,8 +524,9 @@ FOREX_CALENDAR_KEYBOARD = [
         InlineKeyboardButton("USDCAD", callback_data="instrument_USDCAD_calendar"),
         InlineKeyboardButton("EURGBP", callback_data="instrument_EURGBP_calendar")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+FOREX_CALENDAR_MARKUP = InlineKeyboardMarkup(FOREX_CALENDAR_KEYBOARD)
 
 # Crypto keyboard voor analyse
 CRYPTO_KEYBOARD = [
@@ -425,16 +535,18 @@ CRYPTO_KEYBOARD = [
         InlineKeyboardButton("ETHUSD", callback_data="instrument_ETHUSD_chart"),
         InlineKeyboardButton("XRPUSD", callback_data="instrument_XRPUSD_chart")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+CRYPTO_MARKUP = InlineKeyboardMarkup(CRYPTO_KEYBOARD)
 
 # Signal analysis keyboard
 SIGNAL_ANALYSIS_KEYBOARD = [
     [InlineKeyboardButton("📈 Technical Analysis", callback_data=CALLBACK_SIGNAL_TECHNICAL)],
     [InlineKeyboardButton("🧠 Market Sentiment", callback_data=CALLBACK_SIGNAL_SENTIMENT)],
     [InlineKeyboardButton("📅 Economic Calendar", callback_data=CALLBACK_SIGNAL_CALENDAR)],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_to_signal")]
+    [_back("back_to_signal")]
 ]
+SIGNAL_ANALYSIS_MARKUP = InlineKeyboardMarkup(SIGNAL_ANALYSIS_KEYBOARD)
 
 # Crypto keyboard voor sentiment analyse
 CRYPTO_SENTIMENT_KEYBOARD = [
@@ -443,8 +555,9 @@ CRYPTO_SENTIMENT_KEYBOARD = [
         InlineKeyboardButton("ETHUSD", callback_data="instrument_ETHUSD_sentiment"),
         InlineKeyboardButton("XRPUSD", callback_data="instrument_XRPUSD_sentiment")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+CRYPTO_SENTIMENT_MARKUP = InlineKeyboardMarkup(CRYPTO_SENTIMENT_KEYBOARD)
 
 # Indices keyboard voor analyse
 INDICES_KEYBOARD = [
@@ -453,8 +566,9 @@ INDICES_KEYBOARD = [
         InlineKeyboardButton("US500", callback_data="instrument_US500_chart"),
         InlineKeyboardButton("US100", callback_data="instrument_US100_chart")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+INDICES_MARKUP = InlineKeyboardMarkup(INDICES_KEYBOARD)
 
 # Indices keyboard voor signals - Fix de "Terug" knop naar "Back"
 INDICES_KEYBOARD_SIGNALS = [
@@ -463,8 +577,9 @@ INDICES_KEYBOARD_SIGNALS = [
         InlineKeyboardButton("US500", callback_data="instrument_US500_signals"),
         InlineKeyboardButton("US100", callback_data="instrument_US100_signals")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+INDICES_SIGNALS_MARKUP = InlineKeyboardMarkup(INDICES_KEYBOARD_SIGNALS)
 
 # Commodities keyboard voor analyse
 COMMODITIES_KEYBOARD = [
@@ -473,8 +588,9 @@ COMMODITIES_KEYBOARD = [
         InlineKeyboardButton("SILVER", callback_data="instrument_XAGUSD_chart"),
         InlineKeyboardButton("OIL", callback_data="instrument_USOIL_chart")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+COMMODITIES_MARKUP = InlineKeyboardMarkup(COMMODITIES_KEYBOARD)
 
 # Commodities keyboard voor signals - Fix de "Terug" knop naar "Back"
 COMMODITIES_KEYBOARD_SIGNALS = [
@@ -483,8 +599,9 @@ COMMODITIES_KEYBOARD_SIGNALS = [
         InlineKeyboardButton("XAGUSD", callback_data="instrument_XAGUSD_signals"),
         InlineKeyboardButton("USOIL", callback_data="instrument_USOIL_signals")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+COMMODITIES_SIGNALS_MARKUP = InlineKeyboardMarkup(COMMODITIES_KEYBOARD_SIGNALS)
 
 # Forex keyboard for signals
 FOREX_KEYBOARD_SIGNALS = [
@@ -497,8 +614,9 @@ FOREX_KEYBOARD_SIGNALS = [
         InlineKeyboardButton("USDCAD", callback_data="instrument_USDCAD_signals"),
         InlineKeyboardButton("EURGBP", callback_data="instrument_EURGBP_signals")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+FOREX_SIGNALS_MARKUP = InlineKeyboardMarkup(FOREX_KEYBOARD_SIGNALS)
 
 # Crypto keyboard for signals
 CRYPTO_KEYBOARD_SIGNALS = [
@@ -507,8 +625,9 @@ CRYPTO_KEYBOARD_SIGNALS = [
         InlineKeyboardButton("ETHUSD", callback_data="instrument_ETHUSD_signals"),
         InlineKeyboardButton("XRPUSD", callback_data="instrument_XRPUSD_signals")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+CRYPTO_SIGNALS_MARKUP = InlineKeyboardMarkup(CRYPTO_KEYBOARD_SIGNALS)
 
 # Indices keyboard voor sentiment analyse
 INDICES_SENTIMENT_KEYBOARD = [
@@ -517,8 +636,9 @@ INDICES_SENTIMENT_KEYBOARD = [
         InlineKeyboardButton("US500", callback_data="instrument_US500_sentiment"),
         InlineKeyboardButton("US100", callback_data="instrument_US100_sentiment")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+INDICES_SENTIMENT_MARKUP = InlineKeyboardMarkup(INDICES_SENTIMENT_KEYBOARD)
 
 # Commodities keyboard voor sentiment analyse
 COMMODITIES_SENTIMENT_KEYBOARD = [
@@ -527,8 +647,9 @@ COMMODITIES_SENTIMENT_KEYBOARD = [
         InlineKeyboardButton("SILVER", callback_data="instrument_XAGUSD_sentiment"),
         InlineKeyboardButton("OIL", callback_data="instrument_USOIL_sentiment")
     ],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_market")]
+    [_back("back_market")]
 ]
+COMMODITIES_SENTIMENT_MARKUP = InlineKeyboardMarkup(COMMODITIES_SENTIMENT_KEYBOARD)
 
 # Style keyboard
 STYLE_KEYBOARD = [
@@ -536,19 +657,33 @@ STYLE_KEYBOARD = [
     [InlineKeyboardButton("🏃 Scalp (15m)", callback_data="style_scalp")],
     [InlineKeyboardButton("📊 Intraday (1h)", callback_data="style_intraday")],
     [InlineKeyboardButton("🌊 Swing (4h)", callback_data="style_swing")],
-    [InlineKeyboardButton("⬅️ Back", callback_data="back_instrument")]
+    [_back("back_instrument")]
 ]
-
-# Timeframe mapping
-STYLE_TIMEFRAME_MAP = {
+STYLE_MARKUP = InlineKeyboardMarkup(STYLE_KEYBOARD)
+
+# Stripe checkout links: één keer uit de environment gelezen
+STRIPE_REACTIVATION_URL = os.getenv("STRIPE_REACTIVATION_LINK", "https://buy.stripe.com/9AQcPf3j63HL5JS145")
+STRIPE_TRIAL_CHECKOUT_URL = os.getenv("STRIPE_TRIAL_CHECKOUT_LINK", "https://buy.stripe.com/3cs3eF9Hu9256NW9AA")
+
+# Reactivation / trial keyboards: de Stripe URLs veranderen niet tijdens
+# runtime, dus ook deze markups kunnen één keer gebouwd worden
+REACTIVATION_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Reactivate Subscription", url=STRIPE_REACTIVATION_URL)]
+])
+TRIAL_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔥 Start 14-day FREE Trial", url=STRIPE_TRIAL_CHECKOUT_URL)]
+])
+
+# Timeframe mapping (read-only)
+STYLE_TIMEFRAME_MAP = types.MappingProxyType({
     "test": "1m",
     "scalp": "15m",
     "intraday": "1h",
     "swing": "4h"
-}
+})
 
 # Mapping of instruments to their allowed timeframes - updated 2023-03-23
-INSTRUMENT_TIMEFRAME_MAP = {
+_RAW_INSTRUMENT_TIMEFRAMES = {
     # H1 timeframe only
     "AUDJPY": "H1", 
     "AUDCHF": "H1",
@@ -598,158 +733,215 @@ INSTRUMENT_TIMEFRAME_MAP = {
     "US100": "M30",   # Added for consistency with INDICES_KEYBOARD_SIGNALS
     "XAGUSD": "M15",  # Added for consistency with COMMODITIES_KEYBOARD_SIGNALS
     "USOIL": "M30"    # Added for consistency with COMMODITIES_KEYBOARD_SIGNALS
-    
+
     # Removed as requested: EU50, FR40, LTCUSD
 }
 
-# Map common timeframe notations
-TIMEFRAME_DISPLAY_MAP = {
+# Read-only, met geïnterneerde keys zodat dict lookups de pointer-equality
+# fast-path van CPython raken voor symbolen die per signaal opgezocht worden
+INSTRUMENT_TIMEFRAME_MAP = types.MappingProxyType({
+    sys.intern(k): sys.intern(v) for k, v in _RAW_INSTRUMENT_TIMEFRAMES.items()
+})
+
+# Map common timeframe notations (read-only)
+TIMEFRAME_DISPLAY_MAP = types.MappingProxyType({
     "M15": "15 Minutes",
-    "M30": "30 Minutes", 
+    "M30": "30 Minutes",
     "H1": "1 Hour",
     "H4": "4 Hours"
-}
+})
+
+# Instrument -> market type, eenmalig opgebouwd bij import zodat
+# _detect_market geen lijsten hoeft te scannen per signaal
+_COMMODITY_INSTRUMENTS = frozenset([
+    "XAUUSD",  # Gold
+    "XAGUSD",  # Silver
+    "WTIUSD",  # Oil WTI
+    "BCOUSD",  # Oil Brent
+])
+_CRYPTO_BASES = ("BTC", "ETH", "XRP", "SOL", "BNB", "ADA", "DOT", "LINK")
+_INDEX_INSTRUMENTS = frozenset([
+    "US30", "US500", "US100",  # US indices
+    "UK100", "DE40", "FR40",   # European indices
+    "JP225", "AU200", "HK50"   # Asian indices
+])
+
+_INSTRUMENT_MARKET: Dict[str, str] = {}
+for _instrument in _COMMODITY_INSTRUMENTS:
+    _INSTRUMENT_MARKET[_instrument] = "commodities"
+for _instrument in _INDEX_INSTRUMENTS:
+    _INSTRUMENT_MARKET[_instrument] = "indices"
+for _instrument in list(INSTRUMENT_CURRENCY_MAP) + list(INSTRUMENT_TIMEFRAME_MAP):
+    if _instrument in _INSTRUMENT_MARKET or _instrument == "GLOBAL":
+        continue
+    if any(c in _instrument for c in _CRYPTO_BASES):
+        _INSTRUMENT_MARKET[_instrument] = "crypto"
+    else:
+        _INSTRUMENT_MARKET[_instrument] = "forex"
+del _instrument
 
 # Voeg deze functie toe aan het begin van bot.py, na de imports
+@lru_cache(maxsize=128)
 def _detect_market(instrument: str) -> str:
     """Detecteer market type gebaseerd op instrument"""
     instrument = instrument.upper()
-    
-    # Commodities eerst checken
-    commodities = [
-        "XAUUSD",  # Gold
-        "XAGUSD",  # Silver
-        "WTIUSD",  # Oil WTI
-        "BCOUSD",  # Oil Brent
-    ]
-    if instrument in commodities:
-        logger.info(f"Detected {instrument} as commodity")
-        return "commodities"
-    
-    # Crypto pairs
-    crypto_base = ["BTC", "ETH", "XRP", "SOL", "BNB", "ADA", "DOT", "LINK"]
-    if any(c in instrument for c in crypto_base):
-        logger.info(f"Detected {instrument} as crypto")
-        return "crypto"
-    
-    # Major indices
-    indices = [
-        "US30", "US500", "US100",  # US indices
-        "UK100", "DE40", "FR40",   # European indices
-        "JP225", "AU200", "HK50"   # Asian indices
-    ]
-    if instrument in indices:
-        logger.info(f"Detected {instrument} as index")
-        return "indices"
-    
-    # Forex pairs als default
-    logger.info(f"Detected {instrument} as forex")
-    return "forex"
+    market = _INSTRUMENT_MARKET.get(instrument)
+    if market is None:
+        # Onbekend instrument: crypto herkennen aan de base currency, anders forex
+        market = "crypto" if any(c in instrument for c in _CRYPTO_BASES) else "forex"
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Detected %s as %s", instrument, market)
+    return market
+
+# Eén gecompileerde regex voor alle geprefixte callback data
+# (instrument_EURUSD_chart, market_forex_sentiment, back_menu, ...)
+_CALLBACK_RE = re.compile(r'^(analyze_from_signal|instrument|market|style|timeframe|back)_(.+)$')
+
+# TTL voor de in-memory subscription cache (seconden)
+_SUBSCRIPTION_CACHE_TTL = 60.0
 
 # Voeg dit toe als decorator functie bovenaan het bestand na de imports
 def require_subscription(func):
     """Check if user has an active subscription"""
     async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
         user_id = update.effective_user.id
-        
-        # Check subscription status
-        is_subscribed = await self.db.is_user_subscribed(user_id)
-        
-        # Check if payment has failed
-        payment_failed = await self.db.has_payment_failed(user_id)
-        
+
+        is_subscribed, payment_failed = await self._get_sub_state(user_id)
+
         if is_subscribed and not payment_failed:
             # User has subscription, proceed with function
             return await func(self, update, context, *args, **kwargs)
         else:
             if payment_failed:
                 # Show payment failure message
-                failed_payment_text = f"""
-❗ <b>Subscription Payment Failed</b> ❗
-
-Your subscription payment could not be processed and your service has been deactivated.
-
-To continue using Sigmapips AI and receive trading signals, please reactivate your subscription by clicking the button below.
-                """
-                
-                # Use direct URL link for reactivation
-                reactivation_url = "https://buy.stripe.com/9AQcPf3j63HL5JS145"
-                
-                # Create button for reactivation
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Reactivate Subscription", url=reactivation_url)]
-                ]
+                failed_payment_text = FAILED_PAYMENT_TEXT
+                reply_markup = REACTIVATION_MARKUP
             else:
                 # Show subscription screen with the welcome message from the screenshot
-                failed_payment_text = f"""
-🚀 <b>Welcome to Sigmapips AI!</b> 🚀
+                failed_payment_text = TRIAL_WELCOME_HTML_TEXT
+                reply_markup = TRIAL_MARKUP
 
-<b>Discover powerful trading signals for various markets:</b>
-• <b>Forex</b> - Major and minor currency pairs
-• <b>Crypto</b> - Bitcoin, Ethereum and other top cryptocurrencies
-• <b>Indices</b> - Global market indices
-• <b>Commodities</b> - Gold, silver and oil
-
-<b>Features:</b>
-✅ Real-time trading signals
-
-✅ Multi-timeframe analysis (1m, 15m, 1h, 4h)
-
-✅ Advanced chart analysis
-
-✅ Sentiment indicators
-
-✅ Economic calendar integration
-
-<b>Start today with a FREE 14-day trial!</b>
-                """
-                
-                # Use direct URL link instead of callback for the trial button
-                reactivation_url = "https://buy.stripe.com/3cs3eF9Hu9256NW9AA"
-                
-                # Create button for trial
-                keyboard = [
-                    [InlineKeyboardButton("🔥 Start 14-day FREE Trial", url=reactivation_url)]
-                ]
-            
             # Handle both message and callback query updates
             if update.callback_query:
                 await update.callback_query.answer()
                 await update.callback_query.edit_message_text(
                     text=failed_payment_text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode=ParseMode.HTML
+                    reply_markup=reply_markup,
+                    parse_mode=_HTML
                 )
             else:
                 await update.message.reply_text(
                     text=failed_payment_text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode=ParseMode.HTML
+                    reply_markup=reply_markup,
+                    parse_mode=_HTML
                 )
             return MENU
     
     return wrapper
 
-# API keys with robust sanitization
-PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY", "").strip()
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "72df8ae1c5dd4d95b6a54c09bcf1b39e").strip()
+# API keys with robust sanitization, als eenmalige bevroren snapshot.
+# __slots__ handmatig: dataclass(slots=True) vereist Python 3.10+ en het
+# deployment image draait 3.9
+@dataclass(frozen=True)
+class _ApiConfig:
+    """Snapshot van de API keys, één keer uit de environment gelezen"""
+    __slots__ = ("perplexity", "deepseek", "tavily", "telegram")
+
+    perplexity: str
+    deepseek: str
+    tavily: str
+    telegram: str
+
+
+def _build_api_config() -> _ApiConfig:
+    perplexity = os.getenv("PERPLEXITY_API_KEY", "").strip()
+    deepseek = os.getenv("DEEPSEEK_API_KEY", "72df8ae1c5dd4d95b6a54c09bcf1b39e").strip()
+
+    # Ensure the Tavily API key is properly formatted with 'tvly-' prefix and sanitized
+    raw_tavily_key = os.getenv("TAVILY_API_KEY", "KbIKVL3UfDfnxRx3Ruw6XhL3OB9qSF9l").strip()
+    tavily = raw_tavily_key.replace('\n', '').replace('\r', '')  # Remove any newlines/carriage returns
+
+    # If the key doesn't start with "tvly-", add the prefix
+    if tavily and not tavily.startswith("tvly-"):
+        tavily = f"tvly-{tavily}"
+        logger.info("Added 'tvly-' prefix to Tavily API key")
+
+    return _ApiConfig(
+        perplexity=perplexity,
+        deepseek=deepseek,
+        tavily=tavily,
+        telegram=os.getenv("TELEGRAM_BOT_TOKEN", "")
+    )
+
+
+API_CONFIG = _build_api_config()
+
+# Module-level aliassen zodat bestaande imports blijven werken
+PERPLEXITY_API_KEY = API_CONFIG.perplexity
+DEEPSEEK_API_KEY = API_CONFIG.deepseek
+TAVILY_API_KEY = API_CONFIG.tavily
+
+
+# aiolimiter is optioneel; zonder die dependency gebruiken we een minimale
+# token bucket met dezelfde "async with" interface
+try:
+    from aiolimiter import AsyncLimiter
+except ImportError:
+    class AsyncLimiter:
+        """Minimale token bucket: max_rate acquisities per time_period seconden"""
+        def __init__(self, max_rate: float, time_period: float = 60):
+            self.max_rate = max_rate
+            self.time_period = time_period
+            self._level = max_rate
+            self._last = time.monotonic()
+            # Lock pas bij eerste gebruik aanmaken: op Python 3.9 bindt
+            # asyncio.Lock() bij constructie aan get_event_loop(), en de
+            # globale limiter wordt al bij module-import geconstrueerd —
+            # vóór uvicorn zijn eigen loop start
+            self._lock = None
+
+        async def __aenter__(self):
+            if self._lock is None:
+                # Geen await tussen check en assignment, dus atomair
+                # binnen de (single-threaded) event loop
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._level = min(self.max_rate, self._level + (now - self._last) * (self.max_rate / self.time_period))
+                    self._last = now
+                    if self._level >= 1:
+                        self._level -= 1
+                        return self
+                    await asyncio.sleep((1 - self._level) * (self.time_period / self.max_rate))
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+def _log_answer_failure(task) -> None:
+    """Done-callback voor fire-and-forget query.answer() taken"""
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("Failed to answer callback query: %s", exc)
+
+_config_logged = False
+
+def _log_config_once() -> None:
+    """Log de (gemaskeerde) API key configuratie, eenmalig bij bot start"""
+    global _config_logged
+    if _config_logged:
+        return
+    _config_logged = True
+
+    if not TAVILY_API_KEY:
+        logger.warning("No Tavily API key configured")
+    elif logger.isEnabledFor(logging.INFO):
+        masked_key = f"{TAVILY_API_KEY[:7]}...{TAVILY_API_KEY[-4:]}" if len(TAVILY_API_KEY) > 11 else f"{TAVILY_API_KEY[:4]}..."
+        logger.info("Using Tavily API key: %s", masked_key)
 
-# Ensure the Tavily API key is properly formatted with 'tvly-' prefix and sanitized
-raw_tavily_key = os.getenv("TAVILY_API_KEY", "KbIKVL3UfDfnxRx3Ruw6XhL3OB9qSF9l").strip()
-TAVILY_API_KEY = raw_tavily_key.replace('\n', '').replace('\r', '')  # Remove any newlines/carriage returns
 
-# If the key doesn't start with "tvly-", add the prefix
-if TAVILY_API_KEY and not TAVILY_API_KEY.startswith("tvly-"):
-    TAVILY_API_KEY = f"tvly-{TAVILY_API_KEY}"
-    logger.info("Added 'tvly-' prefix to Tavily API key")
-    
-# Log API key (partially masked)
-if TAVILY_API_KEY:
-    masked_key = f"{TAVILY_API_KEY[:7]}...{TAVILY_API_KEY[-4:]}" if len(TAVILY_API_KEY) > 11 else f"{TAVILY_API_KEY[:4]}..."
-    logger.info(f"Using Tavily API key: {masked_key}")
-else:
-    logger.warning("No Tavily API key configured")
-    
 # Set environment variables for the API keys with sanitization
 os.environ["PERPLEXITY_API_KEY"] = PERPLEXITY_API_KEY
 os.environ["DEEPSEEK_API_KEY"] = DEEPSEEK_API_KEY
@@ -766,22 +958,83 @@ class TelegramService:
         self._chart_service = None
         self._sentiment_service = None
         self._calendar_service = None
+        self._sub_cache: Dict[int, tuple] = {}  # user_id -> (timestamp, is_subscribed, payment_failed)
+
+        # Telegram rate limits: 30 msg/s globaal en ~1 msg/s per chat;
+        # pacing voorkomt 429's en de bijbehorende Retry-After straf
+        self._global_limit = AsyncLimiter(30, 1)
+        self._chat_limits: Dict[int, AsyncLimiter] = {}
+        # Sterke referenties naar fire-and-forget tasks: de event loop houdt
+        # zelf alleen weak refs, dus zonder deze set kan een lopende task
+        # tussentijds door de GC opgeruimd worden
+        self._bg_tasks: set = set()
         self.application = None # Added application attribute initialization
         self.polling_started = False # Added polling_started attribute
 
         # Initialize the bot instance
         if self.bot_token:
-            request_settings = {}
+            # Ruime connection pool met keep-alive zodat uitgaande Telegram API
+            # calls TLS handshakes amortiseren bij signal fan-out
+            request_settings = {
+                'connection_pool_size': 256,
+                'connect_timeout': 5.0,
+                'read_timeout': 25.0,
+                'write_timeout': 10.0,
+                'pool_timeout': 1.0
+            }
             if self.proxy_url:
                 request_settings['proxy_url'] = self.proxy_url
-            
-            request = HTTPXRequest(**request_settings) if request_settings else None
+
+            request = HTTPXRequest(**request_settings)
             self.bot = Bot(token=self.bot_token, request=request)
-            logger.info(f"Telegram Bot instance created with token: {self.bot_token[:4]}...{self.bot_token[-4:]}")
+            logger.info("Telegram Bot instance created with token: %s...%s", self.bot_token[:4], self.bot_token[-4:])
         else:
             logger.error("TELEGRAM_BOT_TOKEN not provided. Cannot initialize bot.")
             self.bot = None  # Ensure self.bot exists even if initialization fails
         
+        # O(1) dispatch voor exacte callback data; geprefixte data gaat via _CALLBACK_RE
+        self._callback_handlers = {
+            CALLBACK_MENU_ANALYSE: self.menu_analyse_callback,
+            CALLBACK_MENU_SIGNALS: self.menu_signals_callback,
+            CALLBACK_ANALYSIS_TECHNICAL: self.analysis_technical_callback,
+            CALLBACK_ANALYSIS_SENTIMENT: self.analysis_sentiment_callback,
+            CALLBACK_ANALYSIS_CALENDAR: self.analysis_calendar_callback,
+            CALLBACK_SIGNAL_TECHNICAL: self.signal_technical_callback,
+            CALLBACK_SIGNAL_SENTIMENT: self.signal_sentiment_callback,
+            CALLBACK_SIGNAL_CALENDAR: self.signal_calendar_callback,
+            CALLBACK_SIGNALS_ADD: self.signals_add_callback,
+            CALLBACK_SIGNALS_MANAGE: self.signals_manage_callback,
+            "subscribe_now": self.handle_subscription_callback
+        }
+        # Dispatch per regex-prefix; market/instrument kiezen op context een sub-handler
+        self._prefix_handlers = {
+            "analyze_from_signal": self.analyze_from_signal_callback,
+            "market": self._market_prefix_callback,
+            "instrument": self._instrument_prefix_callback,
+            "back": self.handle_back_button,
+            "timeframe": self.timeframe_callback
+        }
+        # Back-buttons: (handler, doelstate) per callback data. Eén dict lookup
+        # met eager opgeloste states i.p.v. een if/elif keten die elke druk
+        # opnieuw strings vergelijkt en states resolvet
+        self._back_handlers = {
+            CALLBACK_BACK_MENU: (self.show_main_menu, _S_MENU),
+            CALLBACK_BACK_ANALYSIS: (self.menu_analyse_callback, _S_CHOOSE_ANALYSIS),
+            CALLBACK_BACK_MARKET: (None, _S_CHOOSE_MARKET),
+            CALLBACK_BACK_INSTRUMENT: (None, _S_CHOOSE_INSTRUMENT),
+            CALLBACK_BACK_SIGNALS: (self.menu_signals_callback, _S_CHOOSE_SIGNALS),
+            "back_to_signal_analysis": (self._back_to_signal_analysis_callback, _S_CHOOSE_ANALYSIS),
+            "back_to_signal": (self._back_to_signal_callback, _S_SIGNAL_DETAILS),
+        }
+        # Context-gevoelige back-buttons als platte 2x2 tabel:
+        # (callback_data, is_signals_context) -> handler
+        self._back_context_handlers = {
+            (CALLBACK_BACK_MARKET, True): self.signals_add_callback,   # Back to market selection for signals
+            (CALLBACK_BACK_MARKET, False): self.analysis_technical_callback,
+            (CALLBACK_BACK_INSTRUMENT, True): self.market_signals_callback,
+            (CALLBACK_BACK_INSTRUMENT, False): self.market_callback,
+        }
+
         # Only initialize services if not lazy_init
         if not lazy_init:
             self._initialize_services()
@@ -789,43 +1042,101 @@ class TelegramService:
     def _initialize_services(self):
         """Initialize required services"""
         logger.info("Initializing Telegram Bot Services")
-        # Initialize the chart service
-        if not self._chart_service:
+        # Services worden lazy aangemaakt via de properties hieronder;
+        # hier is niets meer te doen bij constructie.
+
+    @property
+    def chart_service(self) -> ChartService:
+        """Chart service, aangemaakt bij eerste gebruik"""
+        if self._chart_service is None:
             self._chart_service = ChartService()
-        
-        # Initialize other services as needed
-        
+            logger.info("Chart service initialized lazily.")
+        return self._chart_service
+
+    @property
+    def sentiment_service(self) -> MarketSentimentService:
+        """Sentiment service, aangemaakt bij eerste gebruik"""
+        if self._sentiment_service is None:
+            self._sentiment_service = MarketSentimentService()
+            logger.info("Market sentiment service initialized lazily.")
+        return self._sentiment_service
+
+    @property
+    def calendar_service(self) -> EconomicCalendarService:
+        """Calendar service, aangemaakt bij eerste gebruik"""
+        if self._calendar_service is None:
+            self._calendar_service = EconomicCalendarService()
+            logger.info("Economic calendar service initialized lazily.")
+        return self._calendar_service
+
+
     async def run(self):
         """Run the Telegram bot"""
         logger.info("Starting Telegram Bot")
-        # Implement bot run logic here
-        
+        _log_config_once()
+        if not self.bot_token:
+            logger.error("Cannot start polling without TELEGRAM_BOT_TOKEN")
+            return
+
+        if self.application is None:
+            self.application = Application.builder().token(self.bot_token).build()
+            self._register_handlers()
+
+        await self.application.initialize()
+        await self.application.start()
+        # Long-polling: laat getUpdates 25s openstaan zodat idle round-trips
+        # van ~12/min naar ~3/min zakken zonder extra bezorg-latency
+        await self.application.updater.start_polling(
+            poll_interval=0.0,
+            timeout=25,
+            bootstrap_retries=-1
+        )
+        self.polling_started = True
+
+    def _register_handlers(self):
+        """Registreer de command en callback handlers op de application"""
+        app = self.application
+        # block=False: een trage handler (chart render, sentiment fetch)
+        # blokkeert zo niet de verwerking van volgende updates
+        app.add_handler(CommandHandler("start", self.start_command, block=False))
+        app.add_handler(CommandHandler("menu", self.menu_command, block=False))
+        app.add_handler(CommandHandler("help", self.help_command, block=False))
+        app.add_handler(CommandHandler("set_subscription", self.set_subscription_command, block=False))
+        app.add_handler(CommandHandler("set_payment_failed", self.set_payment_failed_command, block=False))
+        app.add_handler(CallbackQueryHandler(self.button_callback, block=False))
+
+
     async def initialize_services(self):
         """Initialize services asynchronously"""
         logger.info("Initializing services asynchronously")
-        # Implement async initialization here
-        # Example: Initialize chart service if not already done
-        if not self._chart_service:
-             self._chart_service = ChartService()
-             logger.info("Chart service initialized asynchronously.")
-        # Initialize sentiment service
-        if not self._sentiment_service:
-            # Assuming MarketSentimentService can be initialized without args here
-            # Or pass necessary args if required
-            self._sentiment_service = MarketSentimentService()
-            logger.info("Market sentiment service initialized asynchronously.")
-        # Initialize calendar service
-        if not self._calendar_service:
-            # Assuming EconomicCalendarService can be initialized without args here
-            self._calendar_service = EconomicCalendarService()
-            logger.info("Economic calendar service initialized asynchronously.")
+        # De properties maken elke service aan bij eerste toegang;
+        # hier alleen aanraken om ze alvast warm te zetten.
+        _ = self.chart_service
+        _ = self.sentiment_service
+        _ = self.calendar_service
 
     # --- Added Command Handlers and Helpers ---
 
+    async def _get_sub_state(self, user_id: int) -> tuple:
+        """Geef (is_subscribed, payment_failed) voor een user, met korte TTL cache.
+
+        Alle subscription checks lopen via deze helper zodat herhaalde button
+        presses binnen de TTL geen DB round-trips meer kosten.
+        """
+        cached = self._sub_cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < _SUBSCRIPTION_CACHE_TTL:
+            return cached[1], cached[2]
+
+        # Beide vlaggen komen uit dezelfde subscription rij: één fetch volstaat
+        is_subscribed, payment_failed = await self.db.get_user_status(user_id)
+
+        self._sub_cache[user_id] = (time.monotonic(), is_subscribed, payment_failed)
+        return is_subscribed, payment_failed
+
     async def show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE = None, skip_gif=False) -> None:
         """Show the main menu when /menu command is used"""
         # Use context.bot if available, otherwise use self.bot
-        bot = context.bot if context is not None and hasattr(context, 'bot') else self.bot
+        bot = getattr(context, 'bot', None) or self.bot
         if not bot:
              logger.error("Bot instance not found in show_main_menu")
              return
@@ -833,106 +1144,90 @@ class TelegramService:
         # Check if the user has a subscription
         user_id = update.effective_user.id
         try:
-            is_subscribed = await self.db.is_user_subscribed(user_id)
-            payment_failed = await self.db.has_payment_failed(user_id)
+            is_subscribed, payment_failed = await self._get_sub_state(user_id)
         except Exception as db_error:
-            logger.error(f"Database error in show_main_menu for user {user_id}: {db_error}")
+            logger.error("Database error in show_main_menu for user %s: %s", user_id, db_error)
             await update.effective_message.reply_text("Could not retrieve subscription status. Please try again later.")
             return
 
 
         if is_subscribed and not payment_failed:
-            # Show the main menu for subscribed users
-            reply_markup = InlineKeyboardMarkup(START_KEYBOARD)
-
-            # Forceer altijd de welkomst GIF
+            # Forceer altijd de welkomst GIF (tenzij skip_gif)
             gif_url = "https://media.giphy.com/media/gSzIKNrqtotEYrZv7i/giphy.gif"
+            await self._send_menu(
+                update, bot,
+                text=WELCOME_MESSAGE,
+                markup=START_MARKUP,
+                animation=None if skip_gif else gif_url
+            )
+        else:
+            # Handle non-subscribed users or payment failed
+            await self.start_command(update, context) # Calls start_command logic
 
-            # If we should show the GIF
-            if not skip_gif:
-                try:
-                    current_message = update.effective_message
-                    # For message commands or if no current message to edit
-                    if isinstance(update, Update) and update.message:
-                         # Send the GIF using regular animation method
-                        await update.message.reply_animation(
-                            animation=gif_url,
-                            caption=WELCOME_MESSAGE,
-                            parse_mode=ParseMode.HTML,
-                            reply_markup=reply_markup
-                        )
+    async def _send_menu(self, update: Update, bot, *, text, markup, animation=None) -> None:
+        """Verstuur of bewerk een menubericht: edit bij callback, reply bij message,
+        anders een losse send via de bot.
+
+        Eén try/except met één tekst-fallback, zodat een mislukte GIF-send nooit
+        twee keer hetzelfde bericht naar de chat kan sturen.
+        """
+        query = update.callback_query
+        chat_id = update.effective_chat.id
+        if animation:
+            try:
+                if update.message:
+                    # Send the GIF using regular animation method
+                    await update.message.reply_animation(
+                        animation=animation,
+                        caption=text,
+                        parse_mode=_HTML,
+                        reply_markup=markup
+                    )
+                elif query and query.message:
                     # For callback queries, try to edit the existing message
-                    elif isinstance(update, Update) and update.callback_query and update.callback_query.message:
-                         query = update.callback_query
-                         try:
-                            await query.edit_message_media(
-                                media=InputMediaAnimation(media=gif_url, caption=WELCOME_MESSAGE, parse_mode=ParseMode.HTML),
-                                reply_markup=reply_markup
-                            )
-                         except telegram.error.BadRequest as e:
-                             if "message is not modified" in str(e):
-                                 logger.warning("Menu message already shown (not modified).")
-                             elif "message can't be edited" in str(e) or "there is no media in the message to edit" in str(e):
-                                 logger.warning(f"Cannot edit message media ({e}), sending new message.")
-                                 # Delete old and send new
-                                 try: await query.message.delete()
-                                 except Exception: pass
-                                 await bot.send_animation(
-                                     chat_id=update.effective_chat.id,
-                                     animation=gif_url,
-                                     caption=WELCOME_MESSAGE,
-                                     parse_mode=ParseMode.HTML,
-                                     reply_markup=reply_markup
-                                 )
-                             else:
-                                 raise # Re-raise other BadRequest errors
-                         except Exception as e:
-                             logger.error(f"Error editing message for menu GIF: {e}")
-                             # Fallback: delete old and send new
-                             try: await query.message.delete()
-                             except Exception: pass
-                             await bot.send_animation(
-                                 chat_id=update.effective_chat.id,
-                                 animation=gif_url,
-                                 caption=WELCOME_MESSAGE,
-                                 parse_mode=ParseMode.HTML,
-                                 reply_markup=reply_markup
-                             )
-                    else:
-                         # Fallback if no message or callback_query context
-                        await bot.send_animation(
-                            chat_id=update.effective_chat.id,
-                            animation=gif_url,
-                            caption=WELCOME_MESSAGE,
-                            parse_mode=ParseMode.HTML,
-                            reply_markup=reply_markup
-                        )
-                except Exception as e:
-                    logger.error(f"Failed to send menu GIF: {str(e)}")
-                    # Fallback to text-only approach
                     try:
-                        if update.callback_query:
-                             await update.callback_query.edit_message_text(text=WELCOME_MESSAGE, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
-                        elif update.message:
-                             await update.message.reply_text(text=WELCOME_MESSAGE, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
+                        await query.edit_message_media(
+                            media=InputMediaAnimation(media=animation, caption=text, parse_mode=_HTML),
+                            reply_markup=markup
+                        )
+                    except telegram.error.BadRequest as e:
+                        if "message is not modified" in str(e):
+                            logger.warning("Menu message already shown (not modified).")
                         else:
-                             await bot.send_message(chat_id=update.effective_chat.id, text=WELCOME_MESSAGE, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
-                    except Exception as send_error:
-                         logger.error(f"Failed to send text menu: {str(send_error)}")
+                            # Oud bericht is niet te bewerken: opruimen en opnieuw sturen
+                            logger.warning("Cannot edit message media (%s), sending new message.", e)
+                            await self._safe_delete(query.message)
+                            await bot.send_animation(
+                                chat_id=chat_id,
+                                animation=animation,
+                                caption=text,
+                                parse_mode=_HTML,
+                                reply_markup=markup
+                            )
+                else:
+                    # Fallback if no message or callback_query context
+                    await bot.send_animation(
+                        chat_id=chat_id,
+                        animation=animation,
+                        caption=text,
+                        parse_mode=_HTML,
+                        reply_markup=markup
+                    )
+                return
+            except Exception as e:
+                logger.error("Failed to send menu GIF: %s", str(e))
+                # Val één keer terug op tekst hieronder
+
+        # Tekst-only pad: zowel skip_gif route als fallback na GIF-fout
+        try:
+            if query:
+                await query.edit_message_text(text=text, parse_mode=_HTML, reply_markup=markup)
+            elif update.message:
+                await update.message.reply_text(text=text, parse_mode=_HTML, reply_markup=markup)
             else:
-                # Skip GIF mode - just send text
-                try:
-                    if update.callback_query:
-                         await update.callback_query.edit_message_text(text=WELCOME_MESSAGE, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
-                    elif update.message:
-                         await update.message.reply_text(text=WELCOME_MESSAGE, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
-                    else:
-                         await bot.send_message(chat_id=update.effective_chat.id, text=WELCOME_MESSAGE, parse_mode=ParseMode.HTML, reply_markup=reply_markup)
-                except Exception as send_error:
-                     logger.error(f"Failed to send text menu (skip_gif): {str(send_error)}")
-        else:
-            # Handle non-subscribed users or payment failed
-            await self.start_command(update, context) # Calls start_command logic
+                await bot.send_message(chat_id=chat_id, text=text, parse_mode=_HTML, reply_markup=markup)
+        except Exception as send_error:
+            logger.error("Failed to send text menu: %s", str(send_error))
 
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE = None) -> None:
@@ -942,31 +1237,20 @@ class TelegramService:
         first_name = user.first_name
         username = user.username
 
-        # Try to add the user to the database if they don't exist yet
+        # Registratie en statuscheck in één database-ronde
         try:
-            # Check if user exists (assuming a method like get_user exists)
-            # If not, use get_user_subscription as a proxy check
-            existing_subscription = await self.db.get_user_subscription(user_id)
-
-            if not existing_subscription:
-                # Add new user
-                logger.info(f"New user started: {user_id}, {first_name}, @{username}")
-                # Make sure save_user can handle potential None for last_name
-                await self.db.save_user(user_id, first_name, user.last_name, username)
+            created, is_subscribed, payment_failed = await self.db.upsert_user_and_get_status(
+                user_id, first_name, user.last_name, username
+            )
+            if created:
+                logger.info("New user started: %s, %s, @%s", user_id, first_name, username)
             else:
-                logger.info(f"Existing user started: {user_id}, {first_name}, @{username}")
-
-        except Exception as e:
-            logger.error(f"Error registering user {user_id}: {str(e)}")
+                logger.info("Existing user started: %s, %s, @%s", user_id, first_name, username)
 
-        # Check subscription status again after potential registration
-        is_subscribed = False
-        payment_failed = False
-        try:
-            is_subscribed = await self.db.is_user_subscribed(user_id)
-            payment_failed = await self.db.has_payment_failed(user_id)
+            # Status is vers: meteen in de subscription cache zetten
+            self._sub_cache[user_id] = (time.monotonic(), is_subscribed, payment_failed)
         except Exception as e:
-             logger.error(f"Error checking subscription status for user {user_id}: {str(e)}")
+             logger.error("Error checking subscription status for user %s: %s", user_id, str(e))
              await update.message.reply_text("Could not check your subscription status. Please try again later.")
              return
 
@@ -975,60 +1259,19 @@ class TelegramService:
             # For subscribed users, direct them to use the /menu command instead
             await update.message.reply_text(
                 text="Welcome back! Please use the /menu command to access all features.",
-                parse_mode=ParseMode.HTML
+                parse_mode=_HTML
             )
             return
         elif payment_failed:
             # Show payment failure message
-            failed_payment_text = f"""
-❗ <b>Subscription Payment Failed</b> ❗
-
-Your subscription payment could not be processed and your service has been deactivated.
-
-To continue using Sigmapips AI and receive trading signals, please reactivate your subscription by clicking the button below.
-            """
-
-            # Use direct URL link for reactivation (ensure this is the correct link)
-            reactivation_url = os.getenv("STRIPE_REACTIVATION_LINK", "https://buy.stripe.com/9AQcPf3j63HL5JS145") # Get from env or use default
-
-            # Create button for reactivation
-            keyboard = [
-                [InlineKeyboardButton("🔄 Reactivate Subscription", url=reactivation_url)]
-            ]
-
             await update.message.reply_text(
-                text=failed_payment_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode=ParseMode.HTML
+                text=FAILED_PAYMENT_TEXT,
+                reply_markup=REACTIVATION_MARKUP,
+                parse_mode=_HTML
             )
         else:
             # Show the welcome message with trial option
-            welcome_text = """
-🚀 Welcome to Sigmapips AI! 🚀
-
-Discover powerful trading signals for various markets:
-• Forex - Major and minor currency pairs
-• Crypto - Bitcoin, Ethereum and other top cryptocurrencies
-• Indices - Global market indices
-• Commodities - Gold, silver and oil
-
-Features:
-✅ Real-time trading signals
-✅ Multi-timeframe analysis (1m, 15m, 1h, 4h)
-✅ Advanced chart analysis
-✅ Sentiment indicators
-✅ Economic calendar integration
-
-Start today with a FREE 14-day trial!
-            """
-
-            # Use direct URL link instead of callback for the trial button (ensure this is correct)
-            checkout_url = os.getenv("STRIPE_TRIAL_CHECKOUT_LINK", "https://buy.stripe.com/3cs3eF9Hu9256NW9AA") # Get from env or use default
-
-            # Create buttons - Trial button goes straight to Stripe checkout
-            keyboard = [
-                [InlineKeyboardButton("🔥 Start 14-day FREE Trial", url=checkout_url)]
-            ]
+            welcome_text = TRIAL_WELCOME_TEXT
 
             # Gebruik de juiste welkomst-GIF URL
             welcome_gif_url = "https://media.giphy.com/media/gSzIKNrqtotEYrZv7i/giphy.gif"
@@ -1038,16 +1281,16 @@ Start today with a FREE 14-day trial!
                 await update.message.reply_animation(
                     animation=welcome_gif_url,
                     caption=welcome_text,
-                    parse_mode=ParseMode.HTML,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
+                    parse_mode=_HTML,
+                    reply_markup=TRIAL_MARKUP
                 )
             except Exception as e:
-                logger.error(f"Error sending welcome GIF with caption: {str(e)}")
+                logger.error("Error sending welcome GIF with caption: %s", str(e))
                 # Fallback to text-only message if GIF fails
                 await update.message.reply_text(
                     text=welcome_text,
-                    parse_mode=ParseMode.HTML,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
+                    parse_mode=_HTML,
+                    reply_markup=TRIAL_MARKUP
                 )
 
     async def set_subscription_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE = None) -> None:
@@ -1078,6 +1321,7 @@ Start today with a FREE 14-day trial!
                 await self.db.save_user_subscription(chat_id, plan_type, start_date, end_date)
                 # Also ensure payment failed is false
                 await self.db.set_payment_failed(chat_id, status=False)
+                self._sub_cache.pop(chat_id, None)  # cache invalideren na statuswijziging
                 await update.message.reply_text(f"✅ Subscription set to ACTIVE for user {chat_id} for {days} days.")
             else: # inactive
                 start_date = now - timedelta(days=30) # Arbitrary past date
@@ -1086,20 +1330,21 @@ Start today with a FREE 14-day trial!
                 await self.db.save_user_subscription(chat_id, plan_type, start_date, end_date)
                 # Optionally set payment failed to False as well if they are explicitly made inactive
                 await self.db.set_payment_failed(chat_id, status=False)
+                self._sub_cache.pop(chat_id, None)  # cache invalideren na statuswijziging
                 await update.message.reply_text(f"✅ Subscription set to INACTIVE for user {chat_id}.")
 
-            logger.info(f"Manually set subscription status to {status} for user {chat_id}")
+            logger.info("Manually set subscription status to %s for user %s", status, chat_id)
 
         except ValueError:
             await update.message.reply_text("Invalid arguments. Chat ID and days must be numbers.")
         except Exception as e:
-            logger.error(f"Error in set_subscription_command for {context.args}: {str(e)}")
+            logger.error("Error in set_subscription_command for %s: %s", context.args, str(e))
             await update.message.reply_text(f"An error occurred: {str(e)}")
 
     async def set_payment_failed_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE = None) -> None:
         """Secret command to set a user's subscription to the payment failed state"""
         # Add admin check here if needed
-        logger.info(f"set_payment_failed command received: {update.message.text}")
+        logger.info("set_payment_failed command received: %s", update.message.text)
 
         try:
             if not context.args or len(context.args) < 2:
@@ -1120,33 +1365,31 @@ Start today with a FREE 14-day trial!
             success = await self.db.set_payment_failed(chat_id, status=failed_status)
 
             if success:
+                self._sub_cache.pop(chat_id, None)  # cache invalideren na statuswijziging
                 status_text = "FAILED" if failed_status else "NOT FAILED"
                 message = f"✅ Payment status set to {status_text} for user {chat_id}"
-                logger.info(f"Manually set payment failed status to {failed_status} for user {chat_id}")
-                await update.message.reply_text(message)
+                logger.info("Manually set payment failed status to %s for user %s", failed_status, chat_id)
 
                 # If setting to failed, show the notification message
                 if failed_status:
-                    failed_payment_text = f"""
-❗ <b>Subscription Payment Failed</b> ❗
-
-Your subscription payment could not be processed and your service has been deactivated.
-
-To continue using Sigmapips AI and receive trading signals, please reactivate your subscription by clicking the button below.
-                    """
-                    reactivation_url = os.getenv("STRIPE_REACTIVATION_LINK", "https://buy.stripe.com/9AQcPf3j63HL5JS145")
-                    keyboard = [[InlineKeyboardButton("🔄 Reactivate Subscription", url=reactivation_url)]]
-                    # Send the notification as a new message
-                    await context.bot.send_message( # Use context.bot to send to the target chat_id
-                         chat_id=chat_id,
-                         text=failed_payment_text,
-                         reply_markup=InlineKeyboardMarkup(keyboard),
-                         parse_mode=ParseMode.HTML
-                     )
+                    # Admin bevestiging en gebruikersnotificatie zijn onafhankelijke
+                    # Telegram calls: verstuur ze parallel
+                    await asyncio.gather(
+                        update.message.reply_text(message),
+                        context.bot.send_message( # Use context.bot to send to the target chat_id
+                            chat_id=chat_id,
+                            text=FAILED_PAYMENT_TEXT,
+                            reply_markup=REACTIVATION_MARKUP,
+                            parse_mode=_HTML
+                        ),
+                        return_exceptions=True
+                    )
+                else:
+                    await update.message.reply_text(message)
             else:
                 status_text = "FAILED" if failed_status else "NOT FAILED"
                 message = f"❌ Could not set payment status to {status_text} for user {chat_id}"
-                logger.error(f"Database returned failure for set_payment_failed for user {chat_id}")
+                logger.error("Database returned failure for set_payment_failed for user %s", chat_id)
                 await update.message.reply_text(message)
 
         except ValueError:
@@ -1159,7 +1402,7 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE = None) -> None:
         """Send a message when the command /help is issued."""
         # Consider sending a specific help message instead of just the menu
-        # await update.message.reply_text(HELP_MESSAGE, parse_mode=ParseMode.HTML)
+        # await update.message.reply_text(HELP_MESSAGE, parse_mode=_HTML)
         # For now, showing the main menu as per original file structure
         await self.show_main_menu(update, context)
 
@@ -1176,143 +1419,181 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
             return None
 
         callback_data = query.data
-        logger.info(f"Button callback received: {callback_data} from user {update.effective_user.id}")
+        user_id = update.effective_user.id
+        logger.info("Button callback received: %s from user %s", callback_data, user_id)
 
-        # Answer the callback query immediately
-        try:
-            await query.answer()
-        except Exception as answer_err:
-            logger.warning(f"Failed to answer callback query: {answer_err}")
+        # Answer de callback query parallel aan het routeren; Telegram vereist
+        # alleen dat dit binnen een paar seconden gebeurt, dus niet op wachten
+        answer_task = self._spawn(query.answer())
+        answer_task.add_done_callback(_log_answer_failure)
+
+        # Parse geprefixte callback data één keer i.p.v. een cascade van startswith checks
+        match = _CALLBACK_RE.match(callback_data)
+        prefix = match.group(1) if match else None
 
+        # Plan het echte werk in en geef de controle meteen terug, zodat een
+        # trage handler de webhook/polling response niet ophoudt en Telegram
+        # het update niet opnieuw gaat aanbieden
+        self._spawn(self._route_callback(update, context, callback_data, prefix))
+        return None
+
+    async def _route_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str, prefix: Optional[str]) -> Optional[int]:
+        """Dispatch een callback naar zijn handler; vangt eigen fouten af."""
+        query = update.callback_query
         try:
+            # Fast path: back-buttons direct naar handle_back_button
+            if callback_data in _BACK_CALLBACKS:
+                return await self.handle_back_button(update, context)
+
             # --- Route to specific handlers ---
-            if callback_data == CALLBACK_MENU_ANALYSE:
-                return await self.menu_analyse_callback(update, context)
-            elif callback_data == CALLBACK_MENU_SIGNALS:
-                return await self.menu_signals_callback(update, context)
-            elif callback_data == CALLBACK_ANALYSIS_TECHNICAL:
-                return await self.analysis_technical_callback(update, context)
-            elif callback_data == CALLBACK_ANALYSIS_SENTIMENT:
-                return await self.analysis_sentiment_callback(update, context)
-            elif callback_data == CALLBACK_ANALYSIS_CALENDAR:
-                return await self.analysis_calendar_callback(update, context)
-            elif callback_data == CALLBACK_SIGNAL_TECHNICAL:
-                return await self.signal_technical_callback(update, context)
-            elif callback_data == CALLBACK_SIGNAL_SENTIMENT:
-                return await self.signal_sentiment_callback(update, context)
-            elif callback_data == CALLBACK_SIGNAL_CALENDAR:
-                return await self.signal_calendar_callback(update, context)
-            elif callback_data.startswith("analyze_from_signal_"):
-                 return await self.analyze_from_signal_callback(update, context)
-            elif callback_data.startswith("market_"):
-                 # Separate handlers for analysis and signals context
-                 if context and context.user_data.get('is_signals_context'):
-                     return await self.market_signals_callback(update, context)
-                 else:
-                     return await self.market_callback(update, context) # Needs market_callback implementation
-            elif callback_data.startswith("instrument_"):
-                 # Separate handlers for analysis and signals context
-                 if context and context.user_data.get('is_signals_context'):
-                     return await self.instrument_signals_callback(update, context)
-                 else:
-                     return await self.instrument_callback(update, context) # Needs instrument_callback implementation
-            elif callback_data.startswith("back_"):
-                 return await self.handle_back_button(update, context) # Centralized back handler
-            elif callback_data == CALLBACK_SIGNALS_ADD:
-                return await self.signals_add_callback(update, context)
-            elif callback_data == CALLBACK_SIGNALS_MANAGE:
-                return await self.signals_manage_callback(update, context)
-            elif callback_data.startswith("timeframe_"):
-                return await self.timeframe_callback(update, context) # Needs timeframe_callback implementation
-            elif callback_data == "subscribe_now":
-                return await self.handle_subscription_callback(update, context) # Needs handle_subscription_callback
+            handler = self._callback_handlers.get(callback_data)
+            if handler is None and prefix is not None:
+                handler = self._prefix_handlers.get(prefix)
+
+            if handler is not None:
+                return await handler(update, context)
 
             # Fallback for unhandled callbacks
-            else:
-                logger.warning(f"Unhandled callback data in button_callback: {callback_data}")
-                try:
-                    await query.answer("Action not recognized.") # Notify user
-                except Exception: pass
-                return None # Return None or a default state if using ConversationHandler
+            logger.warning("Unhandled callback data in button_callback: %s", callback_data)
+            try:
+                await query.answer("Action not recognized.") # Notify user
+            except Exception: pass
+            return None # Return None or a default state if using ConversationHandler
 
         except Exception as e:
-            logger.error(f"Error processing button callback '{callback_data}': {str(e)}")
+            logger.error("Error processing button callback '%s': %s", callback_data, str(e))
             logger.exception(e)
             try:
                  # Use query.edit_message_text if possible, otherwise reply
                  # await query.edit_message_text("An error occurred processing your request. Please try again.")
                  await update.effective_message.reply_text("An error occurred processing your request. Please try again.")
             except Exception as notify_error:
-                logger.error(f"Could not notify user about callback error: {notify_error}")
+                logger.error("Could not notify user about callback error: %s", notify_error)
             return None # Return None or a default state
 
+    async def _market_prefix_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
+        """Kies de market handler op basis van de analysis/signals context"""
+        if context and context.user_data.get('is_signals_context'):
+            return await self.market_signals_callback(update, context)
+        return await self.market_callback(update, context)
+
+    async def _instrument_prefix_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
+        """Kies de instrument handler op basis van de analysis/signals context"""
+        if context and context.user_data.get('is_signals_context'):
+            return await self.instrument_signals_callback(update, context)
+        return await self.instrument_callback(update, context)
+
+    def _spawn(self, coro) -> "asyncio.Task":
+        """Plan een achtergrond-coroutine in met een sterke referentie"""
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+        return task
+
+    def _per_chat_limit(self, chat_id: int) -> AsyncLimiter:
+        """Token bucket per chat, lazily aangemaakt"""
+        limit = self._chat_limits.get(chat_id)
+        if limit is None:
+            limit = self._chat_limits[chat_id] = AsyncLimiter(1, 1)
+        return limit
+
+    async def _tg_call(self, coro_factory, *, chat_id: Optional[int] = None, tries: int = 3):
+        """Voer een uitgaande Telegram call uit met pacing, retry en backoff.
+
+        Houdt de globale en (optioneel) per-chat token buckets aan,
+        honoreert de Retry-After van rate limits en gebruikt capped
+        exponentiële backoff met jitter voor netwerk timeouts, zodat een
+        flaky call niet meteen in het brede except-fallback pad belandt.
+        """
+        for attempt in range(tries):
+            try:
+                async with self._global_limit:
+                    if chat_id is not None:
+                        async with self._per_chat_limit(chat_id):
+                            return await coro_factory()
+                    return await coro_factory()
+            except telegram.error.RetryAfter as e:
+                if attempt == tries - 1:
+                    raise
+                await asyncio.sleep(e.retry_after + random.random() * 0.1)
+            except (telegram.error.TimedOut, telegram.error.NetworkError):
+                if attempt == tries - 1:
+                    raise
+                await asyncio.sleep(min(2 ** attempt * 0.25, 4.0) + random.random() * 0.1)
+
+    @staticmethod
+    async def _safe_delete(message) -> None:
+        """Verwijder een bericht op de achtergrond; fouten alleen loggen"""
+        try:
+            await message.delete()
+        except Exception as delete_err:
+            logger.warning("Could not delete previous message: %s", delete_err)
+
     # --- Placeholder methods needed by button_callback ---
     # These need full implementation from .original file later
 
     async def menu_analyse_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
         logger.info("Handling analyse menu callback.") # Changed log level/message
         query = update.callback_query
+        chat_id = update.effective_chat.id
         await query.answer()
         # Needs ANALYSIS_KEYBOARD defined
         try:
-            # Delete the previous message (which likely contains the GIF)
-            try:
-                await query.message.delete()
-            except Exception as delete_err:
-                logger.warning(f"Could not delete previous message in menu_analyse_callback: {delete_err}")
+            # Verwijder het vorige bericht (met de GIF) op de achtergrond;
+            # de gebruiker hoeft niet op deze Telegram round-trip te wachten
+            self._spawn(self._safe_delete(query.message))
 
             # Send a new message with the analysis options
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
+            await self._tg_call(lambda: context.bot.send_message(
+                chat_id=chat_id,
                 text="📊 Select analysis type:", # Added emoji
-                reply_markup=InlineKeyboardMarkup(ANALYSIS_KEYBOARD),
-                parse_mode=ParseMode.HTML
-            )
+                reply_markup=ANALYSIS_MARKUP,
+                parse_mode=_HTML
+            ), chat_id=chat_id)
             # Return state if using ConversationHandler, otherwise None
-            return states.CHOOSE_ANALYSIS if hasattr(states, 'CHOOSE_ANALYSIS') else None
+            return _S_CHOOSE_ANALYSIS
         except Exception as e:
-            logger.error(f"Error showing analysis menu: {e}")
+            logger.error("Error showing analysis menu: %s", e)
             # Send error as a new message if edit fails or wasn't possible
             try:
                  await context.bot.send_message(
-                      chat_id=update.effective_chat.id,
+                      chat_id=chat_id,
                       text="❌ Error showing analysis menu. Please try again."
                  )
             except Exception as send_err:
-                 logger.error(f"Failed to send error message for analysis menu: {send_err}")
+                 logger.error("Failed to send error message for analysis menu: %s", send_err)
             return None
 
     async def menu_signals_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
         logger.info("Handling signals menu callback.") # Changed log level/message
         query = update.callback_query
+        chat_id = update.effective_chat.id
         await query.answer()
          # Needs SIGNALS_KEYBOARD defined
         try:
-            # Delete the previous message (which likely contains the GIF)
-            try:
-                await query.message.delete()
-            except Exception as delete_err:
-                logger.warning(f"Could not delete previous message in menu_signals_callback: {delete_err}")
+            # Verwijder het vorige bericht (met de GIF) op de achtergrond;
+            # de gebruiker hoeft niet op deze Telegram round-trip te wachten
+            self._spawn(self._safe_delete(query.message))
 
             # Send a new message with the signal options
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
+            await self._tg_call(lambda: context.bot.send_message(
+                chat_id=chat_id,
                 text="💡 Select signal action:", # Added emoji
-                reply_markup=InlineKeyboardMarkup(SIGNALS_KEYBOARD),
-                parse_mode=ParseMode.HTML
-            )
+                reply_markup=SIGNALS_MARKUP,
+                parse_mode=_HTML
+            ), chat_id=chat_id)
             # Return state if using ConversationHandler, otherwise None
-            return states.CHOOSE_SIGNALS if hasattr(states, 'CHOOSE_SIGNALS') else None
+            return _S_CHOOSE_SIGNALS
         except Exception as e:
-             logger.error(f"Error showing signals menu: {e}")
+             logger.error("Error showing signals menu: %s", e)
              # Send error as a new message if edit fails or wasn't possible
              try:
                  await context.bot.send_message(
-                     chat_id=update.effective_chat.id,
+                     chat_id=chat_id,
                      text="❌ Error showing signals menu. Please try again."
                  )
              except Exception as send_err:
-                 logger.error(f"Failed to send error message for signals menu: {send_err}")
+                 logger.error("Failed to send error message for signals menu: %s", send_err)
              return None
 
 
@@ -1325,12 +1606,12 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
              # Assume MARKET_KEYBOARD is defined globally
              await query.edit_message_text(
                  text="Select market for technical analysis:",
-                 reply_markup=InlineKeyboardMarkup(MARKET_KEYBOARD)
+                 reply_markup=MARKET_MARKUP
              )
              # Return state if using ConversationHandler, otherwise None
-             return states.CHOOSE_MARKET if hasattr(states, 'CHOOSE_MARKET') else None
+             return _S_CHOOSE_MARKET
         except Exception as e:
-             logger.error(f"Error in placeholder analysis_technical_callback: {e}")
+             logger.error("Error in placeholder analysis_technical_callback: %s", e)
              await query.message.reply_text("Error showing market selection.")
              return None
 
@@ -1343,11 +1624,11 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
              # Assume MARKET_SENTIMENT_KEYBOARD is defined globally
              await query.edit_message_text(
                  text="Select market for sentiment analysis:",
-                 reply_markup=InlineKeyboardMarkup(MARKET_SENTIMENT_KEYBOARD)
+                 reply_markup=MARKET_SENTIMENT_MARKUP
              )
-             return states.CHOOSE_MARKET if hasattr(states, 'CHOOSE_MARKET') else None
+             return _S_CHOOSE_MARKET
         except Exception as e:
-             logger.error(f"Error in placeholder analysis_sentiment_callback: {e}")
+             logger.error("Error in placeholder analysis_sentiment_callback: %s", e)
              await query.message.reply_text("Error showing market selection.")
              return None
 
@@ -1391,7 +1672,7 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
         await query.edit_message_text("Analyze from Signal feature not fully implemented yet.")
         # Needs SIGNAL_ANALYSIS_KEYBOARD defined
         # Should show analysis options for the specific signal instrument
-        return states.CHOOSE_ANALYSIS if hasattr(states, 'CHOOSE_ANALYSIS') else None
+        return _S_CHOOSE_ANALYSIS
 
 
     async def market_signals_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
@@ -1400,7 +1681,7 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
         await query.answer()
         await query.edit_message_text("Market selection for signals not fully implemented yet.")
         # Needs specific instrument keyboards (_SIGNALS versions)
-        return states.CHOOSE_INSTRUMENT if hasattr(states, 'CHOOSE_INSTRUMENT') else None
+        return _S_CHOOSE_INSTRUMENT
 
     async def market_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
         logger.warning("Placeholder: market_callback called. Needs implementation.")
@@ -1408,7 +1689,7 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
         await query.answer()
         await query.edit_message_text("Market selection for analysis not fully implemented yet.")
         # Needs specific instrument keyboards (_chart, _sentiment versions)
-        return states.CHOOSE_INSTRUMENT if hasattr(states, 'CHOOSE_INSTRUMENT') else None
+        return _S_CHOOSE_INSTRUMENT
 
     async def instrument_signals_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
         logger.warning("Placeholder: instrument_signals_callback called. Needs implementation.")
@@ -1416,79 +1697,68 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
         await query.answer()
         await query.edit_message_text("Instrument selection for signals not fully implemented yet.")
         # Needs timeframe selection keyboard
-        return states.CHOOSE_TIMEFRAME if hasattr(states, 'CHOOSE_TIMEFRAME') else None
+        return _S_CHOOSE_TIMEFRAME
 
 
     async def instrument_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
         logger.warning("Placeholder: instrument_callback called. Needs implementation.")
         query = update.callback_query
         await query.answer()
-        # This needs to route to the correct analysis function based on user_data['analysis_type']
-        analysis_type = context.user_data.get('analysis_type', 'technical') # Default or get from context
+        # Route naar de juiste analysis functie op basis van user_data['analysis_type']
+        analysis_type = context.user_data.get('analysis_type', ANALYSIS_TECHNICAL) # Default or get from context
+        method = getattr(self, _ANALYSIS_DISPATCH.get(analysis_type, 'show_technical_analysis'), None)
+        if method is not None:
+            return await method(update, context)
         await query.edit_message_text(f"Instrument selected. Showing {analysis_type} analysis (not implemented).")
-        # Should call show_technical_analysis, show_sentiment_analysis, etc.
         return None # Or final state like SHOW_RESULT
 
     async def handle_back_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
         """Handles various back buttons by routing to appropriate menu."""
         query = update.callback_query
         callback_data = query.data
-        logger.info(f"Handling back button: {callback_data}")
+        logger.info("Handling back button: %s", callback_data)
         await query.answer()
 
-        # Determine the target menu based on callback data or context
-        target_state = None
-        try:
-            if callback_data == CALLBACK_BACK_MENU:
-                await self.show_main_menu(update, context)
-                target_state = states.MENU if hasattr(states, 'MENU') else None
-            elif callback_data == CALLBACK_BACK_ANALYSIS:
-                # Go back to analysis type selection
-                await self.menu_analyse_callback(update, context)
-                target_state = states.CHOOSE_ANALYSIS if hasattr(states, 'CHOOSE_ANALYSIS') else None
-            elif callback_data == CALLBACK_BACK_MARKET:
-                 # Go back to market selection (depends on context: analysis or signals)
-                if context and context.user_data.get('is_signals_context'):
-                     await self.signals_add_callback(update, context) # Back to market selection for signals
-                     target_state = states.CHOOSE_MARKET if hasattr(states, 'CHOOSE_MARKET') else None # Or SIGNALS state?
-                else:
-                     await self.analysis_technical_callback(update, context) # Example: back to market for tech analysis
-                     # Need logic to go back to correct analysis type market selection
-                     target_state = states.CHOOSE_MARKET if hasattr(states, 'CHOOSE_MARKET') else None
-            elif callback_data == CALLBACK_BACK_INSTRUMENT:
-                 # Go back to instrument selection (depends on context)
-                 if context and context.user_data.get('is_signals_context'):
-                      await self.market_signals_callback(update, context) # Back to instrument list for signals
-                      target_state = states.CHOOSE_INSTRUMENT if hasattr(states, 'CHOOSE_INSTRUMENT') else None
-                 else:
-                      await self.market_callback(update, context) # Back to instrument list for analysis
-                      target_state = states.CHOOSE_INSTRUMENT if hasattr(states, 'CHOOSE_INSTRUMENT') else None
-            elif callback_data == CALLBACK_BACK_SIGNALS:
-                 # Go back to signals add/manage menu
-                 await self.menu_signals_callback(update, context)
-                 target_state = states.CHOOSE_SIGNALS if hasattr(states, 'CHOOSE_SIGNALS') else None # Or SIGNALS state?
-            elif callback_data == "back_to_signal_analysis":
-                 # Needs back_to_signal_analysis_callback implementation
-                 logger.warning("Placeholder: back_to_signal_analysis called. Needs implementation.")
-                 await query.edit_message_text("Back to Signal Analysis (not implemented).")
-                 target_state = states.CHOOSE_ANALYSIS if hasattr(states, 'CHOOSE_ANALYSIS') else None
-            elif callback_data == "back_to_signal":
-                 # Needs back_to_signal_callback implementation
-                 logger.warning("Placeholder: back_to_signal called. Needs implementation.")
-                 await query.edit_message_text("Back to Signal Details (not implemented).")
-                 target_state = states.SIGNAL_DETAILS if hasattr(states, 'SIGNAL_DETAILS') else None
-            else:
-                 logger.warning(f"Unhandled back button: {callback_data}")
-                 await self.show_main_menu(update, context) # Default to main menu
-                 target_state = states.MENU if hasattr(states, 'MENU') else None
+        # user_data één keer binden en de vlag één keer berekenen i.p.v. het
+        # attribute/method-lookup paar per branch te herhalen
+        ud = context.user_data if context else None
+        is_signals = bool(ud.get('is_signals_context')) if ud else False
 
+        # Determine the target menu based on callback data
+        entry = self._back_handlers.get(callback_data)
+        rendered = False
+        try:
+            if entry is None:
+                logger.warning("Unhandled back button: %s", callback_data)
+                await self.show_main_menu(update, context) # Default to main menu
+                return _S_MENU
+
+            handler, target_state = entry
+            if handler is None:
+                # Market/instrument hangen af van de analysis/signals context
+                handler = self._back_context_handlers[(callback_data, is_signals)]
+            await handler(update, context)
+            rendered = True
             return target_state
 
-        except Exception as e:
-             logger.error(f"Error handling back button {callback_data}: {e}")
-             await query.message.reply_text("Error going back. Returning to main menu.")
-             await self.show_main_menu(update, context)
-             return states.MENU if hasattr(states, 'MENU') else None
+        except (TelegramError, KeyError, AttributeError) as e:
+             logger.error("Error handling back button %s: %s", callback_data, e)
+             # Alleen terugvallen op het hoofdmenu als er nog niets gerenderd is;
+             # een tweede render zou een extra API call doen en flood-control raken
+             if not rendered:
+                 await query.message.reply_text("Error going back. Returning to main menu.")
+                 await self.show_main_menu(update, context)
+             return _S_MENU
+
+    async def _back_to_signal_analysis_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        # Needs back_to_signal_analysis_callback implementation
+        logger.warning("Placeholder: back_to_signal_analysis called. Needs implementation.")
+        await update.callback_query.edit_message_text("Back to Signal Analysis (not implemented).")
+
+    async def _back_to_signal_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        # Needs back_to_signal_callback implementation
+        logger.warning("Placeholder: back_to_signal called. Needs implementation.")
+        await update.callback_query.edit_message_text("Back to Signal Details (not implemented).")
 
 
     async def signals_add_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
@@ -1500,12 +1770,12 @@ To continue using Sigmapips AI and receive trading signals, please reactivate yo
              # Assume MARKET_KEYBOARD_SIGNALS is defined globally
              await query.edit_message_text(
                   text="Select market to add signals for:",
-                  reply_markup=InlineKeyboardMarkup(MARKET_KEYBOARD_SIGNALS),
-                  parse_mode=ParseMode.HTML
+                  reply_markup=MARKET_SIGNALS_MARKUP,
+                  parse_mode=_HTML
              )
-             return states.CHOOSE_MARKET if hasattr(states, 'CHOOSE_MARKET') else None
+             return _S_CHOOSE_MARKET
         except Exception as e:
-             logger.error(f"Error in placeholder signals_add_callback: {e}")
+             logger.error("Error in placeholder signals_add_callback: %s", e)
              await query.message.reply_text("Error showing market selection for signals.")
              return None
 
@@ -4,6 +4,7 @@
 import asyncio
 import logging
 import sys
+from types import SimpleNamespace
 
 # Configure logging
 logging.basicConfig(
@@ -22,192 +23,144 @@ from telegram.ext import ContextTypes
 from trading_bot.services.telegram_service.bot import TelegramService
 from trading_bot.services.database.db import Database
 
+# Eén module-level template voor user_data: de (lange) signal string wordt zo
+# één keer aangemaakt en elke test doet alleen een shallow copy
+_USER_DATA_TEMPLATE = {
+    'from_signal': True,
+    'instrument': 'EURUSD',
+    'signal_instrument': 'EURUSD',
+    'signal_id': 'EURUSD_BUY_1h_99999',
+    'signal_instrument_backup': 'EURUSD',
+    'signal_id_backup': 'EURUSD_BUY_1h_99999',
+    'signal_direction_backup': 'BUY',
+    'signal_timeframe_backup': '1h',
+    'is_signals_context': True,
+    'signal_direction': 'BUY',
+    'signal_timeframe': '1h',
+    'original_signal_message': '🎯 New Trading Signal 🎯\n\nInstrument: EURUSD\nAction: BUY 🟢\n\nEntry Price: 1.0850\nStop Loss: 1.0800 🔴\nTake Profit 1: 1.0900 🎯\nTake Profit 2: 1.0950 🎯\nTake Profit 3: 1.1000 🎯\n\n1h\nTradingView Signal\n\n————————————————————\n\n• Position size: 1-2% max\n• Use proper stop loss\n• Follow your trading plan\n\n————————————————————\n\n🤖 SigmaPips AI Verdict:\n\nThe EURUSD buy signal shows a promising setup with defined entry at 1.0850 and stop loss at 1.0800. Trade aligns with market sentiment. Multiple take profit levels provide opportunities for partial profit taking. The risk-reward ratio is reasonable at 1.00:1.',
+    'analysis_type': 'technical'
+}
+
 class MockQuery:
     """Mock class for callback query testing"""
+    __slots__ = ('data', 'message', 'id')
+
     def __init__(self, data, message):
         self.data = data
         self.message = message
         self.id = "test123"
     
     async def answer(self, *args, **kwargs):
-        logger.info(f"Mock query answered: {self.data}")
+        logger.info("Mock query answered: %s", self.data)
         return True
     
     async def edit_message_text(self, text, **kwargs):
-        logger.info(f"Mock edit_message_text: {text[:30]}...")
+        logger.info("Mock edit_message_text: %s...", text[:30])
         return True
     
     async def edit_message_media(self, media, **kwargs):
-        logger.info(f"Mock edit_message_media called")
+        logger.info("Mock edit_message_media called")
         return True
     
     async def edit_message_caption(self, caption, **kwargs):
-        logger.info(f"Mock edit_message_caption: {caption[:30]}...")
+        logger.info("Mock edit_message_caption: %s...", caption[:30])
         return True
 
 class MockMessage:
     """Mock class for message testing"""
+    __slots__ = ('message_id', 'chat_id')
+
     def __init__(self, message_id=1, chat_id=123456):
         self.message_id = message_id
         self.chat_id = chat_id
     
     async def delete(self):
-        logger.info(f"Mock message deleted")
+        logger.info("Mock message deleted")
         return True
     
     async def reply_text(self, text, **kwargs):
-        logger.info(f"Mock reply_text: {text[:30]}...")
+        logger.info("Mock reply_text: %s...", text[:30])
         return True
 
 class MockUser:
     """Mock class for user testing"""
+    __slots__ = ('id', 'username')
+
     def __init__(self, id=123456, username="test_user"):
         self.id = id
         self.username = username
 
 class MockChat:
     """Mock class for chat testing"""
+    __slots__ = ('id',)
+
     def __init__(self, id=123456):
         self.id = id
 
 class MockBot:
     """Mock class for bot testing"""
+    __slots__ = ()
+
     async def send_message(self, chat_id, text, **kwargs):
-        logger.info(f"Mock send_message to {chat_id}: {text[:30]}...")
+        logger.info("Mock send_message to %s: %s...", chat_id, text[:30])
         return MockMessage()
     
     async def send_photo(self, chat_id, photo, **kwargs):
-        logger.info(f"Mock send_photo to {chat_id}")
+        logger.info("Mock send_photo to %s", chat_id)
         return MockMessage()
     
     async def edit_message_text(self, chat_id, message_id, text, **kwargs):
-        logger.info(f"Mock edit_message_text to {chat_id}: {text[:30]}...")
+        logger.info("Mock edit_message_text to %s: %s...", chat_id, text[:30])
         return True
 
 class MockContext:
     """Mock class for context testing"""
+    __slots__ = ('user_data', 'bot')
+
     def __init__(self):
-        self.user_data = {
-            'from_signal': True,
-            'instrument': 'EURUSD',
-            'signal_instrument': 'EURUSD',
-            'signal_id': 'EURUSD_BUY_1h_99999',
-            'signal_instrument_backup': 'EURUSD',
-            'signal_id_backup': 'EURUSD_BUY_1h_99999',
-            'signal_direction_backup': 'BUY',
-            'signal_timeframe_backup': '1h',
-            'is_signals_context': True,
-            'signal_direction': 'BUY',
-            'signal_timeframe': '1h',
-            'original_signal_message': '🎯 New Trading Signal 🎯\n\nInstrument: EURUSD\nAction: BUY 🟢\n\nEntry Price: 1.0850\nStop Loss: 1.0800 🔴\nTake Profit 1: 1.0900 🎯\nTake Profit 2: 1.0950 🎯\nTake Profit 3: 1.1000 🎯\n\n1h\nTradingView Signal\n\n————————————————————\n\n• Position size: 1-2% max\n• Use proper stop loss\n• Follow your trading plan\n\n————————————————————\n\n🤖 SigmaPips AI Verdict:\n\nThe EURUSD buy signal shows a promising setup with defined entry at 1.0850 and stop loss at 1.0800. Trade aligns with market sentiment. Multiple take profit levels provide opportunities for partial profit taking. The risk-reward ratio is reasonable at 1.00:1.',
-            'analysis_type': 'technical'
-        }
+        self.user_data = _USER_DATA_TEMPLATE.copy()
         self.bot = MockBot()
 
-async def test_signal_technical():
-    """Test signal_technical_callback and show_technical_analysis"""
-    # Create database connection (use mock or test DB)
-    db = Database(connection_string="sqlite:///:memory:")
-    
-    # Create service instance
-    service = TelegramService(db=db, lazy_init=True)
-    
-    # Create mock objects
-    mock_chat = MockChat()
-    mock_user = MockUser()
-    mock_message = MockMessage()
-    mock_query = MockQuery(data="signal_technical", message=mock_message)
-    
-    # Create mock update
-    update = Update._get_empty_object()
-    update._effective_chat = mock_chat
-    update._effective_user = mock_user
-    update._callback_query = mock_query
-    
-    # Create mock context
-    context = MockContext()
-    
-    # Test signal_technical_callback
-    logger.info("Testing signal_technical_callback...")
-    try:
-        result = await service.signal_technical_callback(update, context)
-        logger.info(f"signal_technical_callback result: {result}")
-    except Exception as e:
-        logger.error(f"Error in signal_technical_callback: {str(e)}")
-        raise
+def _make_update(chat, user, query):
+    """Lichtgewicht fake Update met precies de attributen die de callbacks lezen"""
+    return SimpleNamespace(effective_chat=chat, effective_user=user,
+                           effective_message=None, callback_query=query)
 
-async def test_signal_sentiment():
-    """Test signal_sentiment_callback and show_sentiment_analysis"""
-    # Create database connection (use mock or test DB)
-    db = Database(connection_string="sqlite:///:memory:")
-    
-    # Create service instance
-    service = TelegramService(db=db, lazy_init=True)
-    
+async def _run_signal_test(service, method_name, data):
+    """Voer één signal flow uit tegen de gegeven service"""
     # Create mock objects
-    mock_chat = MockChat()
-    mock_user = MockUser()
-    mock_message = MockMessage()
-    mock_query = MockQuery(data="signal_sentiment", message=mock_message)
-    
-    # Create mock update
-    update = Update._get_empty_object()
-    update._effective_chat = mock_chat
-    update._effective_user = mock_user
-    update._callback_query = mock_query
-    
-    # Create mock context
+    update = _make_update(MockChat(), MockUser(), MockQuery(data=data, message=MockMessage()))
     context = MockContext()
-    
-    # Test signal_sentiment_callback
-    logger.info("Testing signal_sentiment_callback...")
-    try:
-        result = await service.signal_sentiment_callback(update, context)
-        logger.info(f"signal_sentiment_callback result: {result}")
-    except Exception as e:
-        logger.error(f"Error in signal_sentiment_callback: {str(e)}")
-        raise
 
-async def test_signal_calendar():
-    """Test signal_calendar_callback and show_economic_calendar"""
-    # Create database connection (use mock or test DB)
-    db = Database(connection_string="sqlite:///:memory:")
-    
-    # Create service instance
-    service = TelegramService(db=db, lazy_init=True)
-    
-    # Create mock objects
-    mock_chat = MockChat()
-    mock_user = MockUser()
-    mock_message = MockMessage()
-    mock_query = MockQuery(data="signal_calendar", message=mock_message)
-    
-    # Create mock update
-    update = Update._get_empty_object()
-    update._effective_chat = mock_chat
-    update._effective_user = mock_user
-    update._callback_query = mock_query
-    
-    # Create mock context
-    context = MockContext()
-    
-    # Test signal_calendar_callback
-    logger.info("Testing signal_calendar_callback...")
+    logger.info("Testing %s...", method_name)
     try:
-        result = await service.signal_calendar_callback(update, context)
-        logger.info(f"signal_calendar_callback result: {result}")
+        result = await getattr(service, method_name)(update, context)
+        logger.info("%s result: %s", method_name, result)
     except Exception as e:
-        logger.error(f"Error in signal_calendar_callback: {str(e)}")
+        logger.error("Error in %s: %s", method_name, str(e))
         raise
 
+# (method, callback data) per flow; de drie flows verschillen alleen hierin
+_SIGNAL_TESTS = (
+    ('signal_technical_callback', 'signal_technical'),
+    ('signal_sentiment_callback', 'signal_sentiment'),
+    ('signal_calendar_callback', 'signal_calendar'),
+)
+
 async def main():
     """Run all tests"""
     logger.info("Starting signal flow tests...")
-    
-    # Test each flow
-    await test_signal_technical()
-    await test_signal_sentiment()
-    await test_signal_calendar()
+
+    # Eén database en service voor alle flows; per-test opnieuw opbouwen
+    # domineert anders de looptijd van deze smoke tests
+    db = Database(connection_string="sqlite:///:memory:")
+    service = TelegramService(db=db, lazy_init=True)
+
+    # Test each flow concurrently; de flows delen geen mutable state en
+    # awaiten alleen mock I/O
+    await asyncio.gather(
+        *(_run_signal_test(service, method_name, data) for method_name, data in _SIGNAL_TESTS)
+    )
     
     logger.info("All tests completed!")
 
@@ -5,7 +5,8 @@ Responsible for loading and providing access to configuration values.
 import os
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from functools import cached_property
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -37,37 +38,37 @@ class ConfigManager:
             logger.error(f"Error loading config: {e}")
             self._config = {}
     
-    @property
+    # cached_property: config en environment veranderen niet tijdens het
+    # proces, dus elke waarde wordt één keer berekend en daarna als gewoon
+    # instance attribute gelezen
+    @cached_property
     def TELEGRAM_BOT_TOKEN(self) -> str:
         """Get the Telegram bot token."""
         return self._config.get('TELEGRAM_BOT_TOKEN') or os.environ.get('TELEGRAM_BOT_TOKEN', '')
     
-    @property
+    @cached_property
     def TRADINGVIEW_USERNAME(self) -> str:
         """Get the TradingView username."""
         return self._config.get('TRADINGVIEW_USERNAME') or os.environ.get('TRADINGVIEW_USERNAME', '')
     
-    @property
+    @cached_property
     def TRADINGVIEW_PASSWORD(self) -> str:
         """Get the TradingView password."""
         return self._config.get('TRADINGVIEW_PASSWORD') or os.environ.get('TRADINGVIEW_PASSWORD', '')
     
-    @property
-    def SUPPORTED_INSTRUMENTS(self) -> List[str]:
-        """Get the list of supported instruments."""
-        default = ['eurusd', 'gbpusd', 'usdjpy', 'audusd']
+    @cached_property
+    def SUPPORTED_INSTRUMENTS(self) -> Tuple[str, ...]:
+        """Get the supported instruments as an immutable tuple."""
+        default = ('eurusd', 'gbpusd', 'usdjpy', 'audusd')
         from_config = self._config.get('SUPPORTED_INSTRUMENTS', [])
         from_env = os.environ.get('SUPPORTED_INSTRUMENTS')
-        
+
         if from_env:
-            try:
-                return [i.strip().lower() for i in from_env.split(',')]
-            except:
-                logger.error("Error parsing SUPPORTED_INSTRUMENTS from environment")
-        
-        return from_config or default
+            return tuple(i.strip().lower() for i in from_env.split(','))
+
+        return tuple(from_config) or default
     
-    @property
+    @cached_property
     def SUPPORTED_MARKETS(self) -> Dict[str, List[str]]:
         """Get the mapping of supported markets for each instrument."""
         default = {
@@ -79,9 +80,10 @@ class ConfigManager:
         }
         
         from_config = self._config.get('SUPPORTED_MARKETS', {})
-        
-        # Merge defaults with config, preferring config values
+
+        # Merge defaults with config, preferring config values; keys lowercase
+        # zodat lookups geen .lower() op de key-kant meer nodig hebben
         result = default.copy()
-        result.update(from_config)
-        
-        return result 
\ No newline at end of file
+        result.update((k.lower(), v) for k, v in from_config.items())
+
+        return result
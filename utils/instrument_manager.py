@@ -8,15 +8,9 @@ from utils.config_manager import ConfigManager
 
 logger = logging.getLogger(__name__)
 
-# Global instance of config manager
-_config_manager = None
-
-def _get_config():
-    """Get or create the global config manager instance."""
-    global _config_manager
-    if _config_manager is None:
-        _config_manager = ConfigManager()
-    return _config_manager
+# Module-level config instance: eager aanmaken vermijdt de None-check per
+# call én een first-init race tussen gelijktijdige asyncio taken
+_CONFIG = ConfigManager()
 
 class InstrumentManager:
     """
@@ -31,9 +25,15 @@ class InstrumentManager:
             supported_instruments: List of supported instrument codes
             supported_markets: Dictionary mapping instruments to supported markets
         """
-        self._supported_instruments = supported_instruments
-        self._supported_markets = supported_markets
-        self._user_selections: Dict[int, Dict[str, str]] = {}  # user_id -> {instrument, market}
+        self._supported_instruments = list(supported_instruments)
+        # Genormaliseerde lookups: één keer lowercasen bij constructie zodat
+        # membership checks O(1) hashed probes zijn i.p.v. list scans
+        self._instrument_set = frozenset(i.lower() for i in supported_instruments)
+        self._market_map = {
+            k.lower(): frozenset(m.lower() for m in v)
+            for k, v in supported_markets.items()
+        }
+        self._user_selections: Dict[int, Tuple[str, str]] = {}  # user_id -> (instrument, market)
         
     def get_supported_instruments(self) -> List[str]:
         """Get the list of supported instruments."""
@@ -49,8 +49,7 @@ class InstrumentManager:
         Returns:
             List of supported market names
         """
-        instrument = instrument.lower()
-        return self._supported_markets.get(instrument, [])
+        return list(self._market_map.get(instrument.lower(), ()))
     
     def set_user_selection(self, user_id: int, instrument: str, market: str):
         """
@@ -61,13 +60,11 @@ class InstrumentManager:
             instrument: The selected instrument
             market: The selected market
         """
-        self._user_selections[user_id] = {
-            'instrument': instrument.lower(),
-            'market': market.lower()
-        }
+        # Tuple i.p.v. dict: kleiner, immutable en goedkoper per selectie
+        self._user_selections[user_id] = (instrument.lower(), market.lower())
         logger.info(f"User {user_id} selected {instrument}/{market}")
     
-    def get_user_selection(self, user_id: int) -> Optional[Dict[str, str]]:
+    def get_user_selection(self, user_id: int) -> Optional[Tuple[str, str]]:
         """
         Get the current instrument and market selection for a user.
         
@@ -75,7 +72,7 @@ class InstrumentManager:
             user_id: Telegram user ID
             
         Returns:
-            Dictionary with 'instrument' and 'market' keys, or None if not set
+            Tuple of (instrument, market), or None if not set
         """
         return self._user_selections.get(user_id)
     
@@ -86,8 +83,7 @@ class InstrumentManager:
         Args:
             user_id: Telegram user ID
         """
-        if user_id in self._user_selections:
-            del self._user_selections[user_id]
+        if self._user_selections.pop(user_id, None) is not None:
             logger.info(f"Cleared selection for user {user_id}")
             
     def is_valid_selection(self, instrument: str, market: str) -> bool:
@@ -102,13 +98,11 @@ class InstrumentManager:
             True if valid, False otherwise
         """
         instrument = instrument.lower()
-        market = market.lower()
-        
-        if instrument not in self._supported_instruments:
+
+        if instrument not in self._instrument_set:
             return False
-            
-        supported_markets = self._supported_markets.get(instrument, [])
-        return market in supported_markets
+
+        return market.lower() in self._market_map.get(instrument, ())
 
 # Helper functions used by the bot
 def get_instruments() -> List[str]:
@@ -118,8 +112,7 @@ def get_instruments() -> List[str]:
     Returns:
         List of instrument codes
     """
-    config = _get_config()
-    return config.SUPPORTED_INSTRUMENTS
+    return _CONFIG.SUPPORTED_INSTRUMENTS
 
 def get_markets_for_instrument(instrument: str) -> List[str]:
     """
@@ -131,7 +124,4 @@ def get_markets_for_instrument(instrument: str) -> List[str]:
     Returns:
         List of supported market names
     """
-    config = _get_config()
-    instrument = instrument.lower()
-    markets = config.SUPPORTED_MARKETS.get(instrument, [])
-    return markets 
\ No newline at end of file
+    return _CONFIG.SUPPORTED_MARKETS.get(instrument.lower(), [])